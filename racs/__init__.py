@@ -1,9 +1,17 @@
 from .pack import unpack
-from .excpetion import RacsException
+from .excpetion import RacsException, RacsTimeoutError, RacsCancelledError, RacsProtocolError
 from .socket import send, recv, ConnectionPool
+from .transport import Transport, TcpTransport, UnixTransport
+from .governor import Governor, PriorityClass, TokenBucket
 from .frame import Frame
 from .pipeline import Pipeline
 from .command import Command
 from .client import Racs
+from .follow import Follower
+from .tune import Tuning, AutoTuner
+from .spool import Spool
+from .singleflight import SingleFlight
+from .cluster import RacsCluster, ClusterPipeline, HashRing
+from .replica import RacsReplicaSet, ReplicaPipeline, Replica
 
 __version__ = "0.0.1"
@@ -1,7 +1,15 @@
+from typing import Optional
+
 from .pipeline import Pipeline
 from .socket import ConnectionPool
+from .governor import Governor
+from .transport import TcpTransport, UnixTransport
+from .excpetion import RacsException
 from .command import Command
 from .stream import Stream
+from .follow import Follower, DEFAULT_WINDOW, DEFAULT_INTERVAL
+from .spool import Spool, DEFAULT_CAPACITY
+from .singleflight import SingleFlight
 
 
 class Racs(Command):
@@ -11,25 +19,72 @@ class Racs(Command):
     The `Racs` class manages a pool of socket connections and provides
     a simple interface for sending commands and executing pipelines.
     """
-    def __init__(self, host: str, port: int, pool_size: int = 3):
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, pool_size: int = 3,
+                 governor: Optional[Governor] = None, timeout: Optional[float] = None,
+                 unix_path: Optional[str] = None, nodelay: bool = True, send_buffer: Optional[int] = None,
+                 recv_buffer: Optional[int] = None, keepalive: Optional[int] = None, singleflight: bool = False):
         """
         Initialize a new RACS client instance.
 
         Parameters
         ----------
-        host : str
+        host : str, optional
             The hostname or IP address of the RACS server.
-        port : int
+        port : int, optional
             The port number to connect to.
         pool_size : int, optional
             The number of socket connections to maintain in the pool (defaults to 3).
+        governor : Governor, optional
+            Scheduler shared by every command, pipeline and stream created from
+            this client. Enforces bandwidth limits, per-class concurrency caps
+            and weighted fair sharing of pooled connections.
+        timeout : float, optional
+            Default time budget in seconds for every request, covering pool
+            checkout, send and receive. Requests never time out if omitted.
+        unix_path : str, optional
+            Path of the server's Unix domain socket. Used instead of
+            `host` and `port` when the server runs on the same host.
+        nodelay : bool, optional
+            Set ``TCP_NODELAY`` on TCP connections (defaults to True).
+        send_buffer : int, optional
+            ``SO_SNDBUF`` size in bytes. The OS default is used if omitted.
+        recv_buffer : int, optional
+            ``SO_RCVBUF`` size in bytes. The OS default is used if omitted.
+        keepalive : int, optional
+            Enable TCP keepalive, probing after this many idle seconds.
+        singleflight : bool, optional
+            Share one round trip among identical read-only commands and
+            pipelines that are in flight at the same time (defaults to False).
+
+        Raises
+        ------
+        RacsException
+            If neither `unix_path` nor both `host` and `port` are given.
         """
-        super().__init__(ConnectionPool(host, port, pool_size))
+        if unix_path is not None:
+            transport = UnixTransport(unix_path, send_buffer, recv_buffer)
+        elif host is not None and port is not None:
+            transport = TcpTransport(host, port, nodelay, send_buffer, recv_buffer, keepalive)
+        else:
+            raise RacsException("either 'unix_path' or 'host' and 'port' must be provided")
+
+        flight = SingleFlight() if singleflight else None
+        super().__init__(ConnectionPool(host, port, pool_size, governor, transport, flight), timeout=timeout)
+
+    @property
+    def singleflight(self) -> Optional[SingleFlight]:
+        """SingleFlight or None: The request coalescer, for its hit and miss counters."""
+        return self._pool.singleflight
 
-    def pipeline(self):
+    def pipeline(self, priority: Optional[str] = None):
         """
         Create a new pipeline for chained command execution.
 
+        Parameters
+        ----------
+        priority : str, optional
+            Priority class used when the client has a :class:`Governor`.
+
         Returns
         -------
         Pipeline
@@ -37,7 +92,62 @@ class Racs(Command):
             commands into a single executable sequence. Commands are joined using
             the pipe operator (`|>`) and executed sequentially.
         """
-        return Pipeline(self._pool)
+        return Pipeline(self._pool, priority, self._timeout)
 
     def stream(self, stream_id):
-        return Stream(self._pool, stream_id)
+        return Stream(self._pool, stream_id).timeout(self._timeout)
+
+    def follow(self, *stream_ids: str, window: float = DEFAULT_WINDOW, interval: float = DEFAULT_INTERVAL,
+               callback=None, priority: Optional[str] = None):
+        """
+        Follow live streams, fetching only newly appended audio.
+
+        Parameters
+        ----------
+        *stream_ids : str
+            Streams to follow.
+        window : float, optional
+            Seconds of recent audio kept per stream (defaults to 10).
+        interval : float, optional
+            Seconds between background polls (defaults to 1).
+        callback : Callable[[str, list[int]], None], optional
+            Called with the stream id and its new samples after every fetch.
+        priority : str, optional
+            Priority class used when the client has a :class:`Governor`.
+
+        Returns
+        -------
+        Follower
+            A follower. Call :meth:`Follower.poll` or use it as a context
+            manager to poll in the background.
+        """
+        return Follower(self._pool, list(stream_ids), window, interval, callback, priority, self._timeout)
+
+    def spool(self, path: str, capacity: int = DEFAULT_CAPACITY, block: bool = False, sync: bool = False,
+              priority: Optional[str] = None):
+        """
+        Open a disk-backed spool that sends batches to this server in the background.
+
+        The client's `timeout` is not applied to the drainer. Producers never
+        wait on it, and a timed out batch would be sent again and duplicated
+        if the server had stored it.
+
+        Parameters
+        ----------
+        path : str
+            Path of the spool file. Unsent batches from a previous run are sent first.
+        capacity : int, optional
+            Size of the on-disk ring buffer in bytes (defaults to 256 MB).
+        block : bool, optional
+            Wait for space when the spool is full instead of raising.
+        sync : bool, optional
+            ``msync`` after every write so batches survive power loss.
+        priority : str, optional
+            Priority class used when the client has a :class:`Governor`.
+
+        Returns
+        -------
+        Spool
+            A spool to pass to :meth:`Stream.spool`.
+        """
+        return Spool(self._pool, path, capacity, block, sync, priority)
@@ -0,0 +1,326 @@
+import bisect
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .excpetion import RacsException
+from .governor import Governor
+from .pipeline import Pipeline
+from .socket import ConnectionPool
+from .stream import Stream
+from .command import Command
+from .utils import stream_hash
+
+
+DEFAULT_VNODES = 160
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping stream ids to nodes.
+
+    Each node is placed on the ring at `vnodes` points. A stream id is owned
+    by the first node point at or after the stream's hash, which is the same
+    64-bit Murmur3 hash carried in the frame header. Adding or removing a
+    node only moves the stream ids owned by that node's points, roughly
+    ``1 / len(nodes)`` of all ids.
+    """
+
+    def __init__(self, nodes=(), vnodes: int = DEFAULT_VNODES):
+        """
+        Initialize a hash ring.
+
+        Parameters
+        ----------
+        nodes : Iterable[tuple[str, int]], optional
+            Initial ``(host, port)`` nodes.
+        vnodes : int, optional
+            Number of ring points per node (defaults to 160).
+        """
+        self._vnodes = vnodes
+        self._keys = []
+        self._nodes = []
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(set(self._nodes))
+
+    def _points(self, node: tuple[str, int]):
+        host, port = node
+        return [stream_hash(f"{host}:{port}#{i}") for i in range(self._vnodes)]
+
+    def add(self, node: tuple[str, int]):
+        """Place `node` on the ring."""
+        for key in self._points(node):
+            i = bisect.bisect_left(self._keys, key)
+            self._keys.insert(i, key)
+            self._nodes.insert(i, node)
+
+    def remove(self, node: tuple[str, int]):
+        """Remove `node` from the ring."""
+        keep = [(k, n) for k, n in zip(self._keys, self._nodes) if n != node]
+        self._keys = [k for k, _ in keep]
+        self._nodes = [n for _, n in keep]
+
+    def get(self, stream_id: str) -> tuple[str, int]:
+        """
+        Return the node that owns `stream_id`.
+
+        Raises
+        ------
+        RacsException
+            If the ring has no nodes.
+        """
+        if not self._keys:
+            raise RacsException("hash ring has no nodes")
+        i = bisect.bisect_left(self._keys, stream_hash(stream_id))
+        return self._nodes[i % len(self._nodes)]
+
+
+class RacsCluster:
+    """
+    Client that shards streams across several RACS servers.
+
+    Each stream id is routed to one node with consistent hashing and every
+    node has its own :class:`ConnectionPool`. ``LIST`` is fanned out to all
+    nodes and the results are merged.
+
+    Example
+    -------
+    >>> c = RacsCluster([("racs-1", 6381), ("racs-2", 6381), ("racs-3", 6381)])
+    >>> c.pipeline().create("vocals", 44100, 2, 16).execute()
+    >>> c.stream("vocals").execute(data)
+    >>> c.pipeline().list("*").execute()
+    """
+
+    def __init__(self, nodes: list[tuple[str, int]], pool_size: int = 3,
+                 governor: Optional[Governor] = None, vnodes: int = DEFAULT_VNODES,
+                 timeout: Optional[float] = None):
+        """
+        Initialize a cluster client.
+
+        Parameters
+        ----------
+        nodes : list[tuple[str, int]]
+            ``(host, port)`` of every RACS server in the cluster.
+        pool_size : int, optional
+            Number of socket connections to maintain per node (defaults to 3).
+        governor : Governor, optional
+            Scheduler shared by the pools of all nodes.
+        vnodes : int, optional
+            Number of hash ring points per node (defaults to 160).
+        timeout : float, optional
+            Default time budget in seconds for every request.
+        """
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._governor = governor
+        self._ring = HashRing(vnodes=vnodes)
+        self._pools = {}
+        self._lock = threading.Lock()
+
+        for host, port in nodes:
+            self.add_node(host, port)
+
+    @property
+    def nodes(self) -> list[tuple[str, int]]:
+        """list[tuple[str, int]]: The nodes currently in the cluster."""
+        with self._lock:
+            return list(self._pools)
+
+    def add_node(self, host: str, port: int):
+        """
+        Add a node to the cluster.
+
+        Only the stream ids that now hash to the new node change owner.
+        Existing audio is not moved, use :meth:`misplaced` to find it.
+        """
+        node = (host, port)
+        with self._lock:
+            if node in self._pools:
+                return
+            self._pools[node] = ConnectionPool(host, port, self._pool_size, self._governor)
+            self._ring.add(node)
+
+    def remove_node(self, host: str, port: int):
+        """Remove a node from the cluster and close its connections."""
+        node = (host, port)
+        with self._lock:
+            pool = self._pools.pop(node, None)
+            self._ring.remove(node)
+        if pool is not None:
+            pool.close()
+
+    def node(self, stream_id: str) -> tuple[str, int]:
+        """Return the ``(host, port)`` of the node that owns `stream_id`."""
+        with self._lock:
+            return self._ring.get(stream_id)
+
+    def pool(self, stream_id: str) -> ConnectionPool:
+        """Return the connection pool of the node that owns `stream_id`."""
+        with self._lock:
+            return self._pools[self._ring.get(stream_id)]
+
+    def pools(self) -> dict:
+        """Return the connection pool of every node, keyed by ``(host, port)``."""
+        with self._lock:
+            return dict(self._pools)
+
+    def execute_command(self, command: str, stream_id: str, timeout: Optional[float] = None):
+        """
+        Execute a raw command on the node that owns `stream_id`.
+
+        Parameters
+        ----------
+        command : str
+            The command string to send to the server.
+        stream_id : str
+            Stream id used to pick the node.
+        timeout : float, optional
+            Time budget in seconds for this call, overriding the default.
+
+        Returns
+        -------
+        Any
+            The unpacked server response.
+        """
+        return Command(self.pool(stream_id), timeout=self._timeout).execute_command(command, timeout)
+
+    def pipeline(self, priority: Optional[str] = None):
+        """
+        Create a new pipeline routed by the stream ids it references.
+
+        Returns
+        -------
+        ClusterPipeline
+            A pipeline that runs on the node owning its streams, or on every
+            node for ``LIST`` and commands without a stream id.
+        """
+        return ClusterPipeline(self, priority, self._timeout)
+
+    def stream(self, stream_id: str):
+        return Stream(self.pool(stream_id), stream_id).timeout(self._timeout)
+
+    def misplaced(self, pattern: str = "*") -> dict:
+        """
+        Find streams stored on a node that no longer owns them.
+
+        Useful after :meth:`add_node` to drive a migration.
+
+        Returns
+        -------
+        dict
+            Mapping of stream id to ``(current_node, owner_node)``.
+        """
+        out = {}
+        for node, pool in self.pools().items():
+            for stream_id in Pipeline(pool, timeout=self._timeout).list(pattern).execute_iter():
+                owner = self.node(stream_id)
+                if owner != node:
+                    out[stream_id] = (node, owner)
+        return out
+
+    def close(self):
+        """Close the connections to every node."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+
+class ClusterPipeline(Pipeline):
+    """
+    Pipeline that routes to cluster nodes by the stream ids it references.
+
+    All stream ids in one pipeline must live on the same node. ``LIST`` is
+    sent to every node and the results are concatenated. Other pipelines
+    without a stream id (``PING``, ``EVAL``, ``SHUTDOWN``) are sent to every
+    node and return a list with one result per node.
+    """
+
+    def __init__(self, cluster: RacsCluster, priority: Optional[str] = None, timeout: Optional[float] = None):
+        super().__init__(None, priority, timeout)
+        self._cluster = cluster
+        self._stream_ids = []
+        self._fanout_list = False
+
+    def range(self, stream_id: str, start: float, duration: float):
+        self._stream_ids.append(stream_id)
+        return super().range(stream_id, start, duration)
+
+    def create(self, stream_id: str, sample_rate: int, channels: int, bit_depth: int):
+        self._stream_ids.append(stream_id)
+        return super().create(stream_id, sample_rate, channels, bit_depth)
+
+    def meta(self, stream_id: str, attr: str):
+        self._stream_ids.append(stream_id)
+        return super().meta(stream_id, attr)
+
+    def open(self, stream_id: str):
+        self._stream_ids.append(stream_id)
+        return super().open(stream_id)
+
+    def close(self, stream_id: str):
+        self._stream_ids.append(stream_id)
+        return super().close(stream_id)
+
+    def list(self, pattern: str):
+        self._fanout_list = True
+        return super().list(pattern)
+
+    def reset(self):
+        super().reset()
+        self._stream_ids.clear()
+        self._fanout_list = False
+
+    def execute_command(self, command: str, timeout: Optional[float] = None):
+        raise RacsException("a cluster pipeline has no single node, use RacsCluster.execute_command with a stream id")
+
+    def _on(self, pool: ConnectionPool) -> Pipeline:
+        pipeline = Pipeline(pool, self._priority, self._timeout)
+        pipeline._commands = list(self._commands)
+        pipeline._deadlines = self._deadlines
+        return pipeline
+
+    def _route(self) -> Optional[ConnectionPool]:
+        """Return the pool owning the referenced streams, or None to fan out."""
+        if not self._stream_ids:
+            return None
+        if self._fanout_list:
+            raise RacsException("LIST cannot be combined with commands on a stream in a cluster pipeline")
+
+        nodes = {self._cluster.node(stream_id) for stream_id in self._stream_ids}
+        if len(nodes) > 1:
+            raise RacsException("pipeline references streams owned by different nodes")
+        return self._cluster.pool(self._stream_ids[0])
+
+    def execute(self, timeout: Optional[float] = None):
+        pool = self._route()
+        if pool is not None:
+            return self._on(pool).execute(timeout)
+
+        pools = list(self._cluster.pools().values())
+        with ThreadPoolExecutor(max_workers=max(1, len(pools))) as executor:
+            results = list(executor.map(lambda p: self._on(p).execute(timeout), pools))
+
+        if self._fanout_list:
+            return list(itertools.chain.from_iterable(results))
+        return results
+
+    def execute_iter(self, timeout: Optional[float] = None):
+        pool = self._route()
+        if pool is not None:
+            return self._on(pool).execute_iter(timeout)
+        if not self._fanout_list:
+            return iter(self.execute(timeout))
+
+        pools = list(self._cluster.pools().values())
+        return itertools.chain.from_iterable(self._on(p).execute_iter(timeout) for p in pools)
+
+    def execute_to(self, dest, *args, **kwargs) -> int:
+        pool = self._route()
+        if pool is None:
+            raise RacsException("execute_to needs a pipeline on a single stream in a cluster")
+        return self._on(pool).execute_to(dest, *args, **kwargs)
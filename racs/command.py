@@ -1,5 +1,22 @@
-from .socket import ConnectionPool, send
-from .pack import unpack
+from contextlib import contextmanager
+from typing import Optional
+
+from .deadline import Deadline
+from .socket import ConnectionPool, send, send_request, write_request, recv_length, recv, readable, reusable
+from .pack import AbandonedResponse, unpack, unpack_to, unpack_iter
+from .excpetion import RacsException
+
+
+READ_COMMANDS = frozenset({
+    "RANGE", "ENCODE", "META", "LIST", "PING",
+    "GAIN", "TRIM", "FADE", "PAN", "PAD", "CLIP", "SPLIT",
+})
+
+
+def is_read(command: str) -> bool:
+    """Return True if every command in a ``|>`` pipeline is in ``READ_COMMANDS``."""
+    parts = [part.split(None, 1) for part in command.split("|>")]
+    return all(part and part[0] in READ_COMMANDS for part in parts)
 
 
 class Command:
@@ -11,7 +28,7 @@ class Command:
     receiving structured responses.
     """
 
-    def __init__(self, pool: ConnectionPool):
+    def __init__(self, pool: ConnectionPool, priority: Optional[str] = None, timeout: Optional[float] = None):
         """
         Initialize a command executor.
 
@@ -19,28 +36,191 @@ class Command:
         ----------
         pool : ConnectionPool
             The connection pool used to manage active socket connections.
+        priority : str, optional
+            Priority class used when the pool has a :class:`Governor` attached.
+        timeout : float, optional
+            Default time budget in seconds for each request, covering pool
+            checkout, send and receive. Requests never time out if omitted.
         """
         self._pool = pool
+        self._priority = priority
+        self._timeout = timeout
+        self._deadlines = set()
 
-    def execute_command(self, command: str):
+    def execute_command(self, command: str, timeout: Optional[float] = None):
         """
         Execute a single command on the RACS server.
 
         This method acquires a socket from the pool, sends the command,
         waits for a response, and then returns the connection to the pool.
 
+        If the pool has a :class:`SingleFlight`, a read-only command that is
+        identical to one already in flight waits for that request and shares
+        its response instead of sending its own.
+
         Parameters
         ----------
         command : str
             The command string to send to the server.
+        timeout : float, optional
+            Time budget in seconds for this call, overriding the default.
 
         Returns
         -------
         Any
             The unpacked server response.
+
+        Raises
+        ------
+        RacsTimeoutError
+            If the request does not complete within the time budget.
+        RacsCancelledError
+            If the request is cancelled with :meth:`cancel`.
+        """
+        request = command.encode() + b'\0'
+        flight = self._pool.singleflight
+        if flight is None or not is_read(command):
+            return unpack(self._request(request, timeout))
+
+        deadline = Deadline(self._timeout if timeout is None else timeout)
+        self._deadlines.add(deadline)
+        try:
+            return flight.do(request, lambda: unpack(self._request(request, timeout)), deadline)
+        finally:
+            self._deadlines.discard(deadline)
+
+    def cancel(self):
+        """
+        Cancel every request currently in flight on this executor.
+
+        Blocked calls raise :class:`RacsCancelledError` and their connections
+        are discarded.
+        """
+        for deadline in list(self._deadlines):
+            deadline.cancel()
+
+    @contextmanager
+    def _connection(self, request: bytes, timeout: Optional[float]):
+        """
+        Check out a connection for `request` under a new deadline.
+
+        Bandwidth is reserved before a connection is checked out, so a request
+        waiting on the governor's token bucket does not hold a socket. The
+        exception is :meth:`_request_window`, see there. On
+        timeout, cancellation or socket errors the connection is discarded
+        rather than returned to the pool.
         """
-        sock = self._pool.get()
+        deadline = Deadline(self._timeout if timeout is None else timeout)
+        self._deadlines.add(deadline)
         try:
-            return unpack(send(sock, command.encode() + b'\0'))
+            self._pool.throttle(len(request), self._priority, deadline)
+            sock = self._pool.get(self._priority, deadline)
+            deadline.attach(sock)
+            try:
+                yield sock, deadline
+            except BaseException as e:
+                deadline.attach(None)
+                if reusable(e) and not deadline.cancelled:
+                    self._pool.put(sock)
+                else:
+                    self._pool.discard(sock)
+                raise
+
+            deadline.attach(None)
+            if deadline.cancelled:
+                self._pool.discard(sock)
+            else:
+                self._pool.put(sock)
         finally:
-            self._pool.put(sock)
+            self._deadlines.discard(deadline)
+
+    def _request(self, request: bytes, timeout: Optional[float] = None) -> bytes:
+        """Send a raw request over a pooled connection and return the raw response."""
+        with self._connection(request, timeout) as (sock, deadline):
+            return send(sock, request, deadline)
+
+    def _request_to(self, request: bytes, fileobj, chunk_size: int, timeout: Optional[float] = None) -> int:
+        """
+        Send a raw request and stream the binary payload of the response to `fileobj`.
+
+        Returns the number of payload bytes written.
+        """
+        with self._connection(request, timeout) as (sock, deadline):
+            length = send_request(sock, request, deadline)
+            return unpack_to(sock, length, fileobj, chunk_size, deadline)
+
+    def _request_iter(self, request: bytes, timeout: Optional[float] = None):
+        """
+        Send a raw request and yield the decoded response items as they arrive.
+
+        The connection is held until the generator is exhausted or closed, and
+        the time budget covers the whole iteration. A connection closed with a
+        large part of the response unread is discarded instead of drained.
+        """
+        try:
+            with self._connection(request, timeout) as (sock, deadline):
+                length = send_request(sock, request, deadline)
+                yield from unpack_iter(sock, length, deadline=deadline)
+        except AbandonedResponse:
+            return
+
+    def _request_window(self, requests, window: int, timeout: Optional[float] = None) -> int:
+        """
+        Send requests back to back on one connection, keeping up to `window` unacknowledged.
+
+        Requests are written in order on a single socket, so the server sees
+        them in order, while the round trip of each acknowledgement overlaps
+        with sending the next requests. The time budget applies to each send
+        and each acknowledgement. If the server rejects a request, the
+        remaining acknowledgements are read before the error is raised.
+
+        Unlike other requests, bandwidth is reserved per request while the
+        socket is held, because `requests` is produced lazily and its sizes
+        are not known up front. A throttled upload therefore keeps its
+        connection and governor slot while it waits on the token bucket.
+        Give bulk uploads their own priority class with a
+        ``max_concurrency`` cap if they must not take slots from other
+        traffic.
+
+        Returns the number of requests sent.
+        """
+        with self._connection(b"", timeout) as (sock, deadline):
+            outstanding = 0
+            sent = 0
+            error = None
+
+            def ack():
+                nonlocal outstanding, error
+                deadline.renew()
+                response = recv(sock, recv_length(sock, deadline), deadline)
+                outstanding -= 1
+                try:
+                    unpack(response)
+                except RacsException as e:
+                    error = error or e
+
+            try:
+                for request in requests:
+                    while outstanding and (outstanding >= window or readable(sock)):
+                        ack()
+                    if error is not None:
+                        break
+
+                    self._pool.throttle(len(request), self._priority, deadline)
+                    deadline.renew()
+                    write_request(sock, request, deadline)
+                    outstanding += 1
+                    sent += 1
+
+                while outstanding:
+                    ack()
+            except BaseException:
+                # Unread acknowledgements leave the socket mid-stream, so
+                # make sure it is discarded rather than returned to the pool.
+                if outstanding:
+                    deadline.cancel()
+                raise
+
+            if error is not None:
+                raise error
+            return sent
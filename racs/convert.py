@@ -0,0 +1,144 @@
+from .excpetion import RacsException
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def is_array(data) -> bool:
+    """
+    Return True if `data` is a numpy array or a sequence of per-channel numpy arrays.
+
+    Plain lists of ints are not arrays and keep using :func:`racs.utils.pack`.
+    """
+    if np is None:
+        return False
+    if isinstance(data, np.ndarray):
+        return True
+    return isinstance(data, (list, tuple)) and len(data) > 0 and isinstance(data[0], np.ndarray)
+
+
+def interleave(data, channels: int):
+    """
+    Arrange samples as a ``(frames, channels)`` array.
+
+    Parameters
+    ----------
+    data : numpy.ndarray or sequence of numpy.ndarray
+        Either a 1-D array of samples interleaved by channel, a 2-D array of
+        shape ``(frames, channels)``, or one 1-D array per channel (planar).
+    channels : int
+        Channel count of the stream.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape ``(frames, channels)``.
+
+    Raises
+    ------
+    RacsException
+        If the input does not have `channels` channels.
+    """
+    if isinstance(data, (list, tuple)):
+        if len(data) != channels:
+            raise RacsException(f"got {len(data)} planar channels, stream has {channels}")
+        if len({len(c) for c in data}) > 1:
+            raise RacsException("planar channels must have the same length")
+        return np.stack(data, axis=1)
+
+    if data.ndim == 1:
+        if len(data) % channels:
+            raise RacsException(f"interleaved sample count {len(data)} is not a multiple of {channels} channels")
+        return data.reshape(-1, channels)
+
+    if data.ndim == 2:
+        if data.shape[1] != channels:
+            raise RacsException(f"got {data.shape[1]} channels, stream has {channels}")
+        return data
+
+    raise RacsException(f"expected 1-D or 2-D samples, got {data.ndim} dimensions")
+
+
+def quantize(data, bit_depth: int, dither: bool = False, rng=None):
+    """
+    Convert samples to integers at `bit_depth`, scaling floats and clipping.
+
+    Float samples are taken as full scale at ``[-1.0, 1.0]``. They are scaled,
+    optionally dithered with triangular (TPDF) noise of one LSB, rounded, and
+    clipped to the signed range of `bit_depth`. Integer samples are assumed
+    to already be at `bit_depth` and are only clipped.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Samples of any shape.
+    bit_depth : int
+        Target bit depth (supported: 16 or 24).
+    dither : bool, optional
+        Add TPDF dither before rounding float samples (defaults to False).
+    rng : numpy.random.Generator, optional
+        Random generator used for dither.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``int32`` array with the same shape as `data`.
+    """
+    if bit_depth not in (16, 24):
+        raise RacsException(f"unsupported bit depth {bit_depth}")
+
+    lo = -(1 << (bit_depth - 1))
+    hi = (1 << (bit_depth - 1)) - 1
+
+    if np.issubdtype(data.dtype, np.floating):
+        x = data.astype(np.float64) * -lo
+        if dither:
+            rng = rng if rng is not None else np.random.default_rng()
+            x += rng.random(x.shape) - rng.random(x.shape)
+        np.rint(x, out=x)
+        np.clip(x, lo, hi, out=x)
+        return x.astype(np.int32)
+
+    if np.issubdtype(data.dtype, np.integer):
+        return np.clip(data, lo, hi).astype(np.int32)
+
+    raise RacsException(f"unsupported sample type {data.dtype}")
+
+
+def to_pcm(data, bit_depth: int, channels: int, dither: bool = False, rng=None) -> bytes:
+    """
+    Convert float or integer, planar or interleaved samples to packed PCM.
+
+    This is the vectorized counterpart of :func:`racs.utils.pack` for numpy
+    input. Requires numpy.
+
+    Parameters
+    ----------
+    data : numpy.ndarray or sequence of numpy.ndarray
+        Samples as accepted by :func:`interleave`.
+    bit_depth : int
+        Target bit depth (supported: 16 or 24).
+    channels : int
+        Channel count of the stream.
+    dither : bool, optional
+        Add TPDF dither before rounding float samples (defaults to False).
+    rng : numpy.random.Generator, optional
+        Random generator used for dither.
+
+    Returns
+    -------
+    bytes
+        Little-endian PCM interleaved by channel, without padding.
+    """
+    if np is None:
+        raise RacsException("numpy is required for sample conversion, install racs[numpy]")
+
+    samples = quantize(interleave(data, channels), bit_depth, dither, rng)
+
+    if bit_depth == 16:
+        return samples.astype("<i2").tobytes()
+
+    b = samples.astype("<i4").reshape(-1, 1).view(np.uint8)
+    return b[:, :3].tobytes()
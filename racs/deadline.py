@@ -0,0 +1,105 @@
+import socket
+import threading
+import time
+from typing import Optional
+
+from .excpetion import RacsTimeoutError, RacsCancelledError
+
+
+POLL_INTERVAL = 0.05
+
+
+class Deadline:
+    """
+    Time budget and cancellation handle for one request.
+
+    A deadline is created when a request starts and is checked at every
+    blocking step: waiting for the governor, checking out a pooled socket,
+    sending and receiving. Cancelling a deadline shuts down the socket the
+    request is using, which unblocks any pending send or receive.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Initialize a deadline.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Budget in seconds from now. The deadline never expires if omitted.
+        """
+        self._timeout = timeout
+        self._expires = None if timeout is None else time.monotonic() + timeout
+        self._cancelled = False
+        self._sock = None
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """bool: True if :meth:`cancel` has been called."""
+        return self._cancelled
+
+    def remaining(self) -> Optional[float]:
+        """
+        Return the seconds left in the budget, or None if unlimited.
+
+        Raises
+        ------
+        RacsCancelledError
+            If the deadline was cancelled.
+        RacsTimeoutError
+            If the budget is spent.
+        """
+        if self._cancelled:
+            raise RacsCancelledError("request cancelled")
+        if self._expires is None:
+            return None
+        remaining = self._expires - time.monotonic()
+        if remaining <= 0:
+            raise RacsTimeoutError("request deadline exceeded")
+        return remaining
+
+    def renew(self):
+        """Restart the budget from now, for exchanges that get a budget per step."""
+        if self._timeout is not None:
+            self._expires = time.monotonic() + self._timeout
+
+    def poll(self) -> Optional[float]:
+        """Return how long a cancellable wait may block before re-checking the deadline."""
+        remaining = self.remaining()
+        return POLL_INTERVAL if remaining is None else min(remaining, POLL_INTERVAL)
+
+    def sleep(self, seconds: float):
+        """Sleep for `seconds`, raising early if the deadline expires or is cancelled."""
+        end = time.monotonic() + seconds
+        while True:
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            remaining = self.remaining()
+            if remaining is not None and remaining < left:
+                raise RacsTimeoutError("request deadline exceeded")
+            time.sleep(min(left, POLL_INTERVAL))
+
+    def attach(self, sock: Optional[socket.socket]):
+        """Set the socket that :meth:`cancel` should shut down."""
+        with self._lock:
+            self._sock = sock
+            cancelled = self._cancelled
+        if cancelled and sock is not None:
+            self._shutdown(sock)
+
+    def cancel(self):
+        """Cancel the request, interrupting any blocking socket operation."""
+        with self._lock:
+            self._cancelled = True
+            sock = self._sock
+        if sock is not None:
+            self._shutdown(sock)
+
+    @staticmethod
+    def _shutdown(sock: socket.socket):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
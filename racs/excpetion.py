@@ -16,3 +16,28 @@ class RacsException(Exception):
             The error message returned by the RACS server.
         """
         super().__init__(message)
+
+
+class RacsTimeoutError(RacsException):
+    """
+    Exception raised when a request exceeds its deadline.
+
+    The deadline covers pool checkout, sending the request and receiving
+    the response. The connection used by the request is discarded.
+    """
+
+
+class RacsCancelledError(RacsException):
+    """
+    Exception raised when an in-flight request is cancelled.
+
+    The connection used by the request is discarded.
+    """
+
+
+class RacsProtocolError(RacsException):
+    """
+    Exception raised when a response cannot be decoded.
+
+    The rest of the response is not read, so the connection is discarded.
+    """
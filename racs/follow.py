@@ -0,0 +1,216 @@
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+from .command import Command
+from .excpetion import RacsException
+from .socket import ConnectionPool
+
+
+DEFAULT_WINDOW = 10.0
+DEFAULT_INTERVAL = 1.0
+MAX_RETRY_INTERVAL = 30.0
+
+
+class _Tail:
+    """Follow state of one stream: format, position and recent samples."""
+
+    def __init__(self, sample_rate: int, channels: int, bit_depth: int, ref: int, window: float):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_size = channels * bit_depth // 8
+        self.ref = ref
+        self.frames = 0
+        self.samples = deque(maxlen=int(window * sample_rate) * channels)
+        self.lock = threading.Lock()
+
+
+class Follower:
+    """
+    Incrementally follow live streams and keep their most recent audio.
+
+    Each poll asks the server for the ``size`` of every stream and fetches only
+    the audio appended since the previous poll with ``RANGE``. The last `window`
+    seconds of every stream are kept in a ring buffer that :meth:`samples` reads
+    without any network traffic. A stream whose ``ref`` changed or whose size
+    shrank was recreated, and is followed again from its tail.
+
+    Example
+    -------
+    >>> with r.follow("vocals", "drums", window=10.0, interval=0.5) as f:
+    ...     while True:
+    ...         level = max(map(abs, f.samples("vocals")), default=0)
+    """
+
+    def __init__(self, pool: ConnectionPool, stream_ids: list[str], window: float = DEFAULT_WINDOW,
+                 interval: float = DEFAULT_INTERVAL, callback: Optional[Callable[[str, list[int]], None]] = None,
+                 priority: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Initialize a follower.
+
+        Parameters
+        ----------
+        pool : ConnectionPool
+            The connection pool used to query the server.
+        stream_ids : list[str]
+            Streams to follow.
+        window : float, optional
+            Seconds of recent audio kept per stream (defaults to 10).
+        interval : float, optional
+            Seconds between polls of the background thread (defaults to 1).
+        callback : Callable[[str, list[int]], None], optional
+            Called with the stream id and the new interleaved samples after
+            every fetch.
+        priority : str, optional
+            Priority class used when the pool has a :class:`Governor` attached.
+        timeout : float, optional
+            Time budget in seconds for each request.
+        """
+        self._command = Command(pool, priority, timeout)
+        self._stream_ids = list(stream_ids)
+        self._window = window
+        self._interval = interval
+        self._callback = callback
+        self._tails = {}
+        self._bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+
+    @property
+    def bytes_received(self) -> int:
+        """int: PCM bytes fetched from the server so far."""
+        return self._bytes
+
+    def samples(self, stream_id: str) -> list[int]:
+        """
+        Return the buffered samples of a stream, oldest first.
+
+        Parameters
+        ----------
+        stream_id : str
+            A followed stream.
+
+        Returns
+        -------
+        list[int]
+            Up to `window` seconds of interleaved samples. Empty before the
+            first poll.
+        """
+        tail = self._tails.get(stream_id)
+        if tail is None:
+            return []
+        with tail.lock:
+            return list(tail.samples)
+
+    def position(self, stream_id: str) -> float:
+        """Return the stream offset in seconds up to which audio was fetched."""
+        tail = self._tails.get(stream_id)
+        return tail.frames / tail.sample_rate if tail is not None else 0.0
+
+    def poll(self) -> dict[str, int]:
+        """
+        Fetch new audio of every followed stream once.
+
+        Returns
+        -------
+        dict[str, int]
+            Number of new frames per stream id.
+        """
+        return {stream_id: self._poll(stream_id) for stream_id in self._stream_ids}
+
+    def _poll(self, stream_id: str) -> int:
+        execute = self._command.execute_command
+        size = execute(f"META '{stream_id}' 'size'")
+        tail = self._tails.get(stream_id)
+
+        if tail is not None and size < tail.frames * tail.frame_size:
+            ref = execute(f"META '{stream_id}' 'ref'")
+            if ref != tail.ref:
+                tail = None
+
+        if tail is None:
+            tail = _Tail(
+                execute(f"META '{stream_id}' 'sample_rate'"),
+                execute(f"META '{stream_id}' 'channels'"),
+                execute(f"META '{stream_id}' 'bit_depth'"),
+                execute(f"META '{stream_id}' 'ref'"),
+                self._window,
+            )
+            self._tails[stream_id] = tail
+
+        total = size // tail.frame_size
+        # Skip audio that would fall out of the ring buffer anyway.
+        start = max(tail.frames, total - tail.samples.maxlen // tail.channels)
+        if total <= start:
+            return 0
+
+        res = execute(
+            f"RANGE '{stream_id}' {start / tail.sample_rate} {(total - start) / tail.sample_rate}"
+        )
+        if not isinstance(res, list):
+            raise RacsException(f"unexpected RANGE response for '{stream_id}'")
+
+        # RANGE works in seconds, so never trust it for more frames than are new.
+        frames = min(len(res) // tail.channels, total - start)
+        res = res[:frames * tail.channels]
+
+        with tail.lock:
+            tail.samples.extend(res)
+            tail.frames = start + frames
+        self._bytes += frames * tail.frame_size
+
+        if self._callback is not None and frames:
+            self._callback(stream_id, res)
+        return frames
+
+    def start(self):
+        """
+        Poll in a background thread every `interval` seconds.
+
+        Returns
+        -------
+        Follower
+            The follower, for use as a context manager.
+        """
+        if self._thread is not None:
+            raise RacsException("follower is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="racs-follow", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        delay = self._interval
+        while not self._stop.is_set():
+            try:
+                self.poll()
+                self._error = None
+                delay = self._interval
+            except Exception as e:
+                # Keep following through server restarts and dropped
+                # connections, retrying from the same position with backoff.
+                self._error = e
+                delay = min(max(delay, self._interval) * 2, max(MAX_RETRY_INTERVAL, self._interval))
+            self._stop.wait(delay)
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """Exception or None: The error of the last failed background poll, cleared by the next success."""
+        return self._error
+
+    def stop(self):
+        """Stop the background thread and wait for it to exit."""
+        self._stop.set()
+        self._command.cancel()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        if self._thread is None:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
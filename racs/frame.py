@@ -1,8 +1,9 @@
 import struct
+from typing import Optional
+
 import crc32c
-import mmh3
 
-from .utils import session_id
+from .utils import session_id, stream_hash
 
 
 class Frame:
@@ -37,10 +38,18 @@ class Frame:
     +------------+-------------------------------------------------------------+------------+--------+-----------+
     """
 
-    def __init__(self):
-        """Initialize an empty RACS frame with default values."""
+    def __init__(self, session: Optional[bytes] = None):
+        """
+        Initialize an empty RACS frame with default values.
+
+        Parameters
+        ----------
+        session : bytes, optional
+            16-byte session id to reuse, so frames built by several workers
+            belong to one session. A new UUID is generated if omitted.
+        """
         self._chunk_id: bytes = b"rsp"
-        self._session_id: bytes = session_id()
+        self._session_id: bytes = session if session is not None else session_id()
         self._stream_id: int = 0
         self._checksum: int = 0
         self._block_size: int = 0
@@ -85,7 +94,7 @@ class Frame:
     @stream_id.setter
     def stream_id(self, stream_id: str):
         """Set the stream ID using a 64-bit Murmur3 hash of the given string."""
-        self._stream_id = mmh3.hash64(stream_id)[0]
+        self._stream_id = stream_hash(stream_id)
 
     @data.setter
     def data(self, data: bytes):
@@ -0,0 +1,303 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from .deadline import Deadline
+from .excpetion import RacsException, RacsTimeoutError
+
+
+DEFAULT_PRIORITY = "default"
+
+
+class TokenBucket:
+    """
+    Token bucket used to limit bandwidth in bytes per second.
+
+    Callers reserve tokens up front and sleep for the deficit, so a request
+    larger than the burst size is still admitted once the bucket has paid
+    off its debt.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize a token bucket.
+
+        Parameters
+        ----------
+        rate : float
+            Refill rate in bytes per second.
+        burst : float, optional
+            Bucket capacity in bytes (defaults to one second worth of `rate`).
+        """
+        if rate <= 0:
+            raise RacsException("'rate' must be > 0")
+        self._rate = float(rate)
+        self._burst = float(burst if burst is not None else rate)
+        self._tokens = self._burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n: int) -> float:
+        """
+        Reserve `n` tokens and return the number of seconds to wait.
+
+        Parameters
+        ----------
+        n : int
+            Number of bytes about to be sent.
+
+        Returns
+        -------
+        float
+            Seconds the caller must wait before sending.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+            self._last = now
+            self._tokens -= n
+            return 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+
+    def refund(self, n: int):
+        """Return `n` tokens reserved by a request that was abandoned."""
+        with self._lock:
+            self._tokens = min(self._burst, self._tokens + n)
+
+    def consume(self, n: int):
+        """Reserve `n` tokens and block until they are available."""
+        wait = self.reserve(n)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class PriorityClass:
+    """
+    Scheduling parameters for one class of traffic.
+
+    Attributes
+    ----------
+    weight : float
+        Relative share of pool connections when classes compete.
+    max_concurrency : int or None
+        Maximum number of connections the class may hold at once.
+    bandwidth : float or None
+        Upload limit for the class in bytes per second.
+    """
+
+    def __init__(self, weight: float = 1.0, max_concurrency: Optional[int] = None, bandwidth: Optional[float] = None):
+        if weight <= 0:
+            raise RacsException("'weight' must be > 0")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise RacsException("'max_concurrency' must be >= 1")
+        self.weight = float(weight)
+        self.max_concurrency = max_concurrency
+        self.bandwidth = bandwidth
+
+
+class _ClassState:
+
+    def __init__(self, params: PriorityClass):
+        self.params = params
+        self.bucket = TokenBucket(params.bandwidth) if params.bandwidth else None
+        self.waiters = deque()
+        self.in_flight = 0
+        self.vtime = 0.0
+
+
+class Governor:
+    """
+    Client-wide scheduler for connections and upload bandwidth.
+
+    Every request made through a :class:`ConnectionPool` that has a governor
+    attached is admitted by the governor first. Admission enforces the
+    per-class concurrency caps and hands free connections to waiting classes
+    in proportion to their weights, so bulk traffic cannot starve latency
+    sensitive traffic. Upload bytes are shaped by an optional client-wide
+    token bucket and optional per-class buckets.
+
+    Connection slots are counted per pool, so when several pools share a
+    governor (one per cluster node or replica), a request waiting for a busy
+    pool never holds a slot that a request for another pool could use.
+
+    Example
+    -------
+    >>> governor = Governor(classes={
+    ...     "live": PriorityClass(weight=8),
+    ...     "bulk": PriorityClass(weight=1, max_concurrency=1, bandwidth=50e6),
+    ... })
+    >>> r = Racs("localhost", 6381, governor=governor)
+    >>> r.stream("archive").priority("bulk").execute(data)
+    """
+
+    def __init__(self, bandwidth: Optional[float] = None, classes: Optional[dict] = None):
+        """
+        Initialize a governor.
+
+        Parameters
+        ----------
+        bandwidth : float, optional
+            Client-wide upload limit in bytes per second. Unlimited if omitted.
+        classes : dict[str, PriorityClass], optional
+            Priority classes by name. A ``"default"`` class with weight 1 is
+            added if not provided.
+        """
+        classes = dict(classes or {})
+        classes.setdefault(DEFAULT_PRIORITY, PriorityClass())
+
+        self._bucket = TokenBucket(bandwidth) if bandwidth else None
+        self._classes = {name: _ClassState(params) for name, params in classes.items()}
+        self._slots = {}
+        self._in_flight = {}
+        self._cond = threading.Condition()
+
+    def attach(self, size: int, pool=None):
+        """Add `size` connection slots for `pool`, called by each pool using this governor."""
+        with self._cond:
+            self._slots[pool] = self._slots.get(pool, 0) + size
+            self._cond.notify_all()
+
+    def detach(self, size: int, pool=None):
+        """Remove the `size` connection slots of `pool`, called when the pool is closed."""
+        with self._cond:
+            self._slots[pool] = self._slots.get(pool, 0) - size
+            if self._slots[pool] <= 0 and not self._in_flight.get(pool):
+                self._slots.pop(pool, None)
+                self._in_flight.pop(pool, None)
+
+    def _state(self, priority: Optional[str]) -> _ClassState:
+        state = self._classes.get(priority or DEFAULT_PRIORITY)
+        if state is None:
+            raise RacsException(f"unknown priority class '{priority}'")
+        return state
+
+    def _eligible(self, state: _ClassState) -> bool:
+        cap = state.params.max_concurrency
+        return cap is None or state.in_flight < cap
+
+    @staticmethod
+    def _first(state: _ClassState, pool) -> Optional[object]:
+        """Return the oldest ticket of `state` waiting for `pool`."""
+        for ticket, key in state.waiters:
+            if key is pool:
+                return ticket
+        return None
+
+    def _next(self, pool) -> Optional[_ClassState]:
+        best = None
+        for state in self._classes.values():
+            if self._eligible(state) and self._first(state, pool) is not None:
+                if best is None or state.vtime < best.vtime:
+                    best = state
+        return best
+
+    def acquire(self, priority: Optional[str] = None, deadline: Optional[Deadline] = None, pool=None):
+        """
+        Block until the class `priority` is granted a connection slot.
+
+        Parameters
+        ----------
+        priority : str, optional
+            Name of the priority class (defaults to ``"default"``).
+        deadline : Deadline, optional
+            Deadline of the request. Blocks indefinitely if omitted.
+        pool : ConnectionPool, optional
+            Pool whose slot is requested. Classes compete only for the
+            slots of the same pool.
+
+        Raises
+        ------
+        RacsTimeoutError
+            If the deadline expires while waiting.
+        RacsCancelledError
+            If the deadline is cancelled while waiting.
+        """
+        state = self._state(priority)
+        ticket = object()
+
+        with self._cond:
+            if not state.waiters:
+                # A class returning from idle must not spend credit it
+                # accumulated while it had nothing to send.
+                active = [s.vtime for s in self._classes.values() if s.waiters or s.in_flight]
+                if active:
+                    state.vtime = max(state.vtime, min(active))
+
+            entry = (ticket, pool)
+            state.waiters.append(entry)
+            try:
+                while not (self._in_flight.get(pool, 0) < self._slots.get(pool, 0)
+                           and self._next(pool) is state
+                           and self._first(state, pool) is ticket):
+                    self._cond.wait(None if deadline is None else deadline.poll())
+            except BaseException:
+                state.waiters.remove(entry)
+                self._cond.notify_all()
+                raise
+
+            state.waiters.remove(entry)
+            state.in_flight += 1
+            state.vtime += 1.0 / state.params.weight
+            self._in_flight[pool] = self._in_flight.get(pool, 0) + 1
+            self._cond.notify_all()
+
+    def release(self, priority: Optional[str] = None, pool=None):
+        """Return a connection slot of `pool` previously granted to `priority`."""
+        state = self._state(priority)
+        with self._cond:
+            state.in_flight -= 1
+            self._in_flight[pool] -= 1
+            self._cond.notify_all()
+
+    def throttle(self, n: int, priority: Optional[str] = None, deadline: Optional[Deadline] = None):
+        """
+        Block until `n` bytes may be sent by the class `priority`.
+
+        Parameters
+        ----------
+        n : int
+            Number of bytes about to be sent.
+        priority : str, optional
+            Name of the priority class (defaults to ``"default"``).
+        deadline : Deadline, optional
+            Deadline of the request. Blocks as long as needed if omitted.
+
+        Raises
+        ------
+        RacsTimeoutError
+            If the bytes cannot be sent before the deadline.
+        """
+        state = self._state(priority)
+        buckets = [b for b in (state.bucket, self._bucket) if b is not None]
+        wait = max([b.reserve(n) for b in buckets], default=0.0)
+        if wait <= 0:
+            return
+
+        if deadline is None:
+            time.sleep(wait)
+            return
+
+        try:
+            remaining = deadline.remaining()
+            if remaining is not None and remaining < wait:
+                raise RacsTimeoutError("request deadline exceeded waiting for bandwidth")
+            deadline.sleep(wait)
+        except BaseException:
+            for bucket in buckets:
+                bucket.refund(n)
+            raise
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of in-flight and waiting requests per class.
+
+        Returns
+        -------
+        dict
+            Mapping of class name to ``{"in_flight": int, "waiting": int}``.
+        """
+        with self._cond:
+            return {
+                name: {"in_flight": state.in_flight, "waiting": len(state.waiters)}
+                for name, state in self._classes.items()
+            }
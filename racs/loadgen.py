@@ -0,0 +1,436 @@
+"""
+Load generator for RACS deployments.
+
+Runs concurrent ingest streams and ``RANGE``/``ENCODE`` readers against a
+RACS server, or against a stand-in server in a child process, and reports
+throughput, latency percentiles per operation and client CPU usage.
+
+Example
+-------
+    racs-loadgen --host localhost --port 6381 --writers 8 --readers 16 --duration 30
+    racs-loadgen --local --writers 4 --readers 4 --format json
+"""
+import argparse
+import fnmatch
+import json
+import math
+import multiprocessing
+import os
+import shlex
+import socketserver
+import struct
+import sys
+import threading
+import time
+from typing import Optional
+
+import msgpack
+import zstandard as zstd
+
+from .client import Racs
+from .excpetion import RacsException
+from .utils import stream_hash
+
+
+# Pause after a failed operation so a down server is not hammered in a tight loop.
+ERROR_BACKOFF = 0.1
+# Audio kept per stand-in stream. Later frames only count towards its size.
+STAND_IN_MAX_BYTES = 16 * 1024 * 1024
+
+
+class _Recorder:
+    """Thread-safe collection of latencies, byte counts and errors per operation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._bytes = {}
+        self._errors = {}
+
+    def record(self, op: str, latency: float, nbytes: int):
+        with self._lock:
+            self._latencies.setdefault(op, []).append(latency)
+            self._bytes[op] = self._bytes.get(op, 0) + nbytes
+
+    def error(self, op: str, e: BaseException):
+        with self._lock:
+            errors = self._errors.setdefault(op, {})
+            key = f"{type(e).__name__}: {e}"
+            errors[key] = errors.get(key, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        with self._lock:
+            out = {}
+            for op in sorted(set(self._latencies) | set(self._errors)):
+                latencies = sorted(self._latencies.get(op, []))
+                errors = self._errors.get(op, {})
+                out[op] = {
+                    "count": len(latencies),
+                    "errors": sum(errors.values()),
+                    "error_kinds": errors,
+                    "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+                    "bytes_per_sec": self._bytes.get(op, 0) / elapsed if elapsed else 0.0,
+                    "p50_ms": _percentile(latencies, 50) * 1000,
+                    "p95_ms": _percentile(latencies, 95) * 1000,
+                    "p99_ms": _percentile(latencies, 99) * 1000,
+                    "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+                }
+            return out
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    k = max(0, math.ceil(len(values) * p / 100.0) - 1)
+    return values[min(k, len(values) - 1)]
+
+
+def _samples(seconds: float, sample_rate: int, channels: int, bit_depth: int) -> list[int]:
+    """Interleaved sine tone at half scale, so compression sees realistic data."""
+    amplitude = (1 << (bit_depth - 2))
+    frames = int(seconds * sample_rate)
+    out = []
+    for i in range(frames):
+        v = int(amplitude * math.sin(2 * math.pi * 440.0 * i / sample_rate))
+        out.extend([v] * channels)
+    return out
+
+
+class _StandInState:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.streams = {}
+        self.hashes = {}
+
+
+class _StandInHandler(socketserver.BaseRequestHandler):
+    """Implements the subset of the RACS protocol exercised by the load generator."""
+
+    def handle(self):
+        f = self.request.makefile("rb")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return
+            request = f.read(int.from_bytes(header, "little"))
+            try:
+                response = self._dispatch(request)
+            except Exception as e:
+                response = ["error", str(e)]
+            out = msgpack.packb(response, use_bin_type=True)
+            self.request.sendall(len(out).to_bytes(8, "little") + out)
+
+    def _dispatch(self, request: bytes) -> list:
+        state = self.server.state
+        # Frame batches are "rsp" followed by a msgpack array, commands are plain text.
+        if request[:3] == b"rsp" and len(request) > 3 and (0x90 <= request[3] <= 0x9f or request[3] in (0xdc, 0xdd)):
+            return self._frames(state, msgpack.unpackb(request[3:]))
+
+        out = ["null"]
+        for part in request.rstrip(b"\0").decode().split("|>"):
+            args = shlex.split(part)
+            op = args[0]
+            with state.lock:
+                if op == "PING":
+                    out = ["string", "PONG"]
+                elif op == "CREATE":
+                    state.streams[args[1]] = {
+                        "sample_rate": int(args[2]), "channels": int(args[3]),
+                        "bit_depth": int(args[4]), "ref": int(time.time() * 1000),
+                        "size": 0, "data": bytearray(),
+                    }
+                    state.hashes[stream_hash(args[1])] = args[1]
+                    out = ["null"]
+                elif op == "META":
+                    stream = self._stream(state, args[1])
+                    out = ["int", stream[args[2]]]
+                elif op in ("OPEN", "CLOSE"):
+                    self._stream(state, args[1])
+                    out = ["null"]
+                elif op == "LIST":
+                    out = ["list"] + [s for s in state.streams if fnmatch.fnmatch(s, args[1])]
+                elif op == "RANGE":
+                    stream = self._stream(state, args[1])
+                    align = stream["channels"] * stream["bit_depth"] // 8
+                    start = int(float(args[2]) * stream["sample_rate"]) * align
+                    end = start + int(float(args[3]) * stream["sample_rate"]) * align
+                    out = ["s16v" if stream["bit_depth"] == 16 else "u8v", bytes(stream["data"][start:end])]
+                elif op == "ENCODE":
+                    out = ["u8v", out[1] if len(out) > 1 and isinstance(out[1], bytes) else b""]
+                else:
+                    raise RacsException(f"unsupported command '{op}'")
+        return out
+
+    @staticmethod
+    def _stream(state: _StandInState, stream_id: str) -> dict:
+        stream = state.streams.get(stream_id)
+        if stream is None:
+            raise RacsException(f"stream '{stream_id}' does not exist")
+        return stream
+
+    @staticmethod
+    def _frames(state: _StandInState, frames: list) -> list:
+        dctx = zstd.ZstdDecompressor()
+        for frame in frames:
+            stream_hash, _, _, flags = struct.unpack_from("<QIHB", frame, 19)
+            data = frame[34:]
+            if flags:
+                data = dctx.decompress(data)
+            with state.lock:
+                stream_id = state.hashes.get(stream_hash)
+                if stream_id is None:
+                    raise RacsException("frame for unknown stream")
+                stream = state.streams[stream_id]
+                stream["size"] += len(data)
+                room = STAND_IN_MAX_BYTES - len(stream["data"])
+                if room > 0:
+                    stream["data"] += data[:room]
+        return ["null"]
+
+
+class _StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.state = _StandInState()
+
+
+def _serve(conn):
+    """Run a stand-in server in a child process and send its address back on `conn`."""
+    server = _StandInServer()
+    conn.send(server.server_address)
+    conn.close()
+    server.serve_forever()
+
+
+def _spawn_stand_in():
+    """
+    Start a stand-in server in a child process.
+
+    The server runs outside the client process, so its CPU time is not counted
+    as client CPU time and it does not compete with the client for the GIL.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_serve, args=(child,), daemon=True)
+    process.start()
+    child.close()
+    try:
+        address = parent.recv()
+    except EOFError:
+        process.join()
+        raise RacsException("stand-in server failed to start")
+    finally:
+        parent.close()
+    return process, address
+
+
+def _writer(r: Racs, args, stream_id: str, samples: list[int], recorder: _Recorder, stop: threading.Event):
+    nbytes = len(samples) * args.bit_depth // 8
+    while not stop.is_set():
+        start = time.monotonic()
+        try:
+            r.stream(stream_id) \
+                .chunk_size(args.chunk_size) \
+                .batch_size(args.batch_size) \
+                .compression(args.compression) \
+                .compression_level(args.compression_level) \
+                .stripes(args.stripes) \
+                .execute(samples)
+        except Exception as e:
+            recorder.error("ingest", e)
+            stop.wait(ERROR_BACKOFF)
+            continue
+        recorder.record("ingest", time.monotonic() - start, nbytes)
+
+
+def _reader(r: Racs, args, stream_ids: list[str], index: int, recorder: _Recorder, stop: threading.Event):
+    op = "range+encode" if args.encode else "range"
+    i = index
+    while not stop.is_set():
+        p = r.pipeline().range(stream_ids[i % len(stream_ids)], 0.0, args.read_seconds)
+        if args.encode:
+            p.encode(args.encode)
+        i += 1
+
+        start = time.monotonic()
+        try:
+            res = p.execute()
+        except Exception as e:
+            recorder.error(op, e)
+            stop.wait(ERROR_BACKOFF)
+            continue
+        size = len(res) * (args.bit_depth // 8) if isinstance(res, list) else len(res or b"")
+        recorder.record(op, time.monotonic() - start, size)
+
+
+def run(args) -> dict:
+    """
+    Run a load test and return the report as a dict.
+
+    Parameters
+    ----------
+    args : argparse.Namespace
+        Parsed command line options, see :func:`parser`.
+
+    Returns
+    -------
+    dict
+        Configuration, per-operation statistics and client CPU usage.
+    """
+    server = None
+    if args.local:
+        server, (args.host, args.port) = _spawn_stand_in()
+
+    pool_size = args.pool_size or max(1, args.writers + args.readers)
+    if args.unix_path:
+        r = Racs(unix_path=args.unix_path, pool_size=pool_size, timeout=args.timeout)
+    else:
+        r = Racs(args.host, args.port, pool_size=pool_size, timeout=args.timeout)
+
+    stream_ids = [f"{args.prefix}-{i}" for i in range(max(1, args.writers))]
+    for stream_id in stream_ids:
+        try:
+            r.pipeline().create(stream_id, args.sample_rate, args.channels, args.bit_depth).execute()
+        except RacsException:
+            pass
+
+    samples = _samples(args.write_seconds, args.sample_rate, args.channels, args.bit_depth)
+    # Give readers something to read before the clock starts.
+    for stream_id in stream_ids:
+        r.stream(stream_id).execute(samples)
+
+    recorder = _Recorder()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_writer, args=(r, args, stream_ids[i], samples, recorder, stop), daemon=True)
+        for i in range(args.writers)
+    ] + [
+        threading.Thread(target=_reader, args=(r, args, stream_ids, i, recorder, stop), daemon=True)
+        for i in range(args.readers)
+    ]
+
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    for t in threads:
+        t.start()
+
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    elapsed = time.monotonic() - wall_start
+    cpu = time.process_time() - cpu_start
+    r._pool.close()
+    if server is not None:
+        server.terminate()
+        server.join()
+
+    return {
+        "config": {
+            "target": "local" if args.local else (args.unix_path or f"{args.host}:{args.port}"),
+            "writers": args.writers,
+            "readers": args.readers,
+            "duration": args.duration,
+            "chunk_size": args.chunk_size,
+            "batch_size": args.batch_size,
+            "compression": args.compression,
+            "compression_level": args.compression_level,
+            "stripes": args.stripes,
+            "sample_rate": args.sample_rate,
+            "channels": args.channels,
+            "bit_depth": args.bit_depth,
+        },
+        "elapsed": elapsed,
+        "cpu": {
+            "seconds": cpu,
+            "percent": 100.0 * cpu / elapsed if elapsed else 0.0,
+            "cores": os.cpu_count(),
+        },
+        "operations": recorder.summary(elapsed),
+    }
+
+
+def format_text(report: dict) -> str:
+    """Render a report as a plain text table."""
+    config = report["config"]
+    lines = [
+        f"target {config['target']}  writers {config['writers']}  readers {config['readers']}  "
+        f"duration {report['elapsed']:.1f}s",
+        f"{'operation':<14}{'count':>8}{'errors':>8}{'ops/s':>10}{'MB/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for op, s in report["operations"].items():
+        lines.append(
+            f"{op:<14}{s['count']:>8}{s['errors']:>8}{s['ops_per_sec']:>10.1f}{s['bytes_per_sec'] / 1e6:>10.2f}"
+            f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}"
+        )
+        for kind, n in s["error_kinds"].items():
+            lines.append(f"  {n} x {kind}")
+    cpu = report["cpu"]
+    lines.append(f"client cpu {cpu['seconds']:.2f}s ({cpu['percent']:.1f}% of one core, {cpu['cores']} cores)")
+    return "\n".join(lines)
+
+
+def parser() -> argparse.ArgumentParser:
+    """Build the ``racs-loadgen`` argument parser."""
+    p = argparse.ArgumentParser(prog="racs-loadgen", description="Generate load against a RACS server.")
+
+    target = p.add_argument_group("target")
+    target.add_argument("--host", default="localhost")
+    target.add_argument("--port", type=int, default=6381)
+    target.add_argument("--unix-path", help="connect over a Unix domain socket")
+    target.add_argument("--local", action="store_true", help="run against a stand-in server in a child process")
+    target.add_argument("--pool-size", type=int, help="connections in the pool (default: writers + readers)")
+    target.add_argument("--timeout", type=float, help="per-request timeout in seconds")
+
+    load = p.add_argument_group("load")
+    load.add_argument("--writers", type=int, default=4, help="concurrent ingest streams")
+    load.add_argument("--readers", type=int, default=4, help="concurrent RANGE readers")
+    load.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    load.add_argument("--prefix", default="loadgen", help="stream id prefix")
+
+    ingest = p.add_argument_group("ingest")
+    ingest.add_argument("--write-seconds", type=float, default=1.0, help="seconds of audio per upload")
+    ingest.add_argument("--chunk-size", type=int, default=1024 * 32)
+    ingest.add_argument("--batch-size", type=int, default=50)
+    ingest.add_argument("--compression", action=argparse.BooleanOptionalAction, default=True)
+    ingest.add_argument("--compression-level", type=int, default=3)
+    ingest.add_argument("--stripes", type=int, default=1)
+    ingest.add_argument("--sample-rate", type=int, default=44100)
+    ingest.add_argument("--channels", type=int, default=2)
+    ingest.add_argument("--bit-depth", type=int, default=16, choices=(16, 24))
+
+    read = p.add_argument_group("read")
+    read.add_argument("--read-seconds", type=float, default=1.0, help="RANGE duration in seconds")
+    read.add_argument("--encode", help="MIME type to ENCODE reads to, e.g. audio/wav")
+
+    out = p.add_argument_group("output")
+    out.add_argument("--format", choices=("text", "json"), default="text")
+    out.add_argument("--output", help="also write the JSON report to this file")
+    return p
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Entry point of the ``racs-loadgen`` console script."""
+    args = parser().parse_args(argv)
+    report = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.format == "json":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print(format_text(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,21 @@
 import struct
 import msgpack
-from typing import Any
+from typing import Any, Optional
 
-from .excpetion import RacsException
+from .excpetion import RacsException, RacsProtocolError
+from .deadline import Deadline
+from .socket import recv, recv_into
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_READ_SIZE = 1024 * 64
+# Largest unread remainder drained when iteration stops early. Past this the
+# connection is dropped instead, since reconnecting is cheaper than reading it.
+MAX_DRAIN = 1024 * 64
+
+
+class AbandonedResponse(Exception):
+    """Raised by :func:`unpack_iter` when it stops early and leaves the socket mid-response."""
 
 
 def unpack_bool(data) -> bool:
@@ -61,36 +74,183 @@ def unpack_error(data):
     raise RacsException(data[1])
 
 
+UNPACKERS = {
+    "bool": unpack_bool,
+    "string": unpack_str,
+    "error": unpack_error,
+    "int": unpack_int,
+    "float": unpack_float,
+    "null": unpack_null,
+    "list": unpack_list,
+    "u8v": unpack_u8v,
+    "s8v": unpack_u8v,
+    "s16v": unpack_s16v,
+    "u16v": unpack_u16v,
+    "s32v": unpack_s32v,
+    "u32v": unpack_u32v,
+    "f32v": unpack_f32,
+    "c64v": unpack_c64,
+}
+
+
+def dispatch(data):
+    fn = UNPACKERS.get(data[0])
+    if fn is None:
+        return None
+    return fn(data)
+
+
 def unpack(b):
-    data = msgpack.unpackb(b)
-
-    tp = data[0]
-    if tp == "bool":
-        return unpack_bool(data)
-    if tp == "string":
-        return unpack_str(data)
-    if tp == "error":
-        return unpack_error(data)
-    if tp == "int":
-        return unpack_int(data)
-    if tp == "float":
-        return unpack_float(data)
-    if tp == "null":
-        return unpack_null(data)
-    if tp == "list":
-        return unpack_list(data)
-    if tp == "u8v" or tp == "s8v":
-        return unpack_u8v(data)
-    if tp == "s16v":
-        return unpack_s16v(data)
-    if tp == "u16v":
-        return unpack_u16v(data)
-    if tp == "s32v":
-        return unpack_s32v(data)
-    if tp == "u32v":
-        return unpack_u32v(data)
-    if tp == "f32v":
-        return unpack_f32(data)
-    if tp == "c64v":
-        return unpack_c64(data)
-    return None
+    return dispatch(msgpack.unpackb(b))
+
+
+class _Reader:
+    """File-like view of the next `length` bytes of a socket."""
+
+    def __init__(self, sock, length: int, deadline: Optional[Deadline] = None):
+        self._sock = sock
+        self._remaining = length
+        self._deadline = deadline
+
+    def read(self, n: int) -> bytes:
+        n = min(n, self._remaining)
+        if n == 0:
+            return b""
+        b = recv(self._sock, n, self._deadline)
+        self._remaining -= len(b)
+        return b
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    def drain(self):
+        while self._remaining:
+            self.read(DEFAULT_CHUNK_SIZE)
+
+
+def unpack_iter(sock, length: int, read_size: int = DEFAULT_READ_SIZE, deadline: Optional[Deadline] = None):
+    """
+    Incrementally decode a response, yielding list items as they arrive.
+
+    The socket is fed into a :class:`msgpack.Unpacker` so a ``list`` response
+    is never materialized as a whole. Any other response type is decoded as
+    usual and yielded once. If the caller stops iterating early, up to
+    ``MAX_DRAIN`` unread bytes are discarded so the socket can be reused.
+    With more left, :class:`AbandonedResponse` is raised instead so the
+    caller drops the connection.
+
+    Parameters
+    ----------
+    sock : socket.socket
+        Socket positioned at the start of the response body.
+    length : int
+        Length of the response body in bytes.
+    read_size : int, optional
+        Number of bytes read from the socket at a time (defaults to 64 KB).
+    deadline : Deadline, optional
+        Deadline covering the whole response.
+
+    Yields
+    ------
+    Any
+        The decoded list items, or the single decoded value.
+
+    Raises
+    ------
+    RacsException
+        If the server returned an error.
+    AbandonedResponse
+        If iteration stopped early with more than ``MAX_DRAIN`` bytes unread.
+    """
+    reader = _Reader(sock, length, deadline)
+    try:
+        unpacker = msgpack.Unpacker(reader, read_size=read_size)
+        n = unpacker.read_array_header()
+        tp = unpacker.unpack()
+
+        if tp == "list":
+            for _ in range(n - 1):
+                yield unpacker.unpack()
+        else:
+            yield dispatch([tp] + [unpacker.unpack() for _ in range(n - 1)])
+    except GeneratorExit:
+        if reader.remaining > MAX_DRAIN:
+            raise AbandonedResponse(f"{reader.remaining} bytes of the response left unread")
+        reader.drain()
+        raise
+
+
+def _read_len(read, marker: int, fixed: int, fixed_mask: int, sized: dict) -> int:
+    if marker & ~fixed_mask == fixed:
+        return marker & fixed_mask
+    if marker in sized:
+        n = sized[marker]
+        return int.from_bytes(read(n), "big")
+    raise RacsProtocolError(f"unexpected msgpack marker {marker:#04x} in response")
+
+
+def unpack_to(sock, length: int, fileobj, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              deadline: Optional[Deadline] = None) -> int:
+    """
+    Stream the binary payload of a response to a file without buffering it.
+
+    Only the msgpack envelope (array header, type string and bin header) is
+    decoded. The payload is then copied from the socket to `fileobj` in
+    chunks of `chunk_size` bytes. If writing fails, the error is raised
+    right away without reading the rest of the payload, so the caller must
+    discard the socket.
+
+    Parameters
+    ----------
+    sock : socket.socket
+        Socket positioned at the start of the response body.
+    length : int
+        Length of the response body in bytes.
+    fileobj : writable binary file
+        Destination of the payload.
+    chunk_size : int, optional
+        Size of the copy buffer in bytes (defaults to 1 MB).
+    deadline : Deadline, optional
+        Deadline covering the whole response.
+
+    Returns
+    -------
+    int
+        Number of payload bytes written.
+
+    Raises
+    ------
+    RacsException
+        If the server returned an error or a response without a binary payload.
+    RacsProtocolError
+        If the response envelope cannot be decoded.
+    """
+    head = bytearray()
+
+    def read(n):
+        b = recv(sock, n, deadline)
+        head.extend(b)
+        return b
+
+    items = _read_len(read, read(1)[0], 0x90, 0x0f, {0xdc: 2, 0xdd: 4})
+    tp = read(_read_len(read, read(1)[0], 0xa0, 0x1f, {0xd9: 1, 0xda: 2, 0xdb: 4})).decode()
+
+    marker = None if items < 2 else read(1)[0]
+    if tp == "error" or items != 2 or marker not in (0xc4, 0xc5, 0xc6):
+        rest = recv(sock, length - len(head), deadline)
+        value = unpack(bytes(head) + rest)
+        raise RacsException(f"response of type '{tp}' has no binary payload: {value!r}")
+
+    size = int.from_bytes(read({0xc4: 1, 0xc5: 2, 0xc6: 4}[marker]), "big")
+
+    buf = memoryview(bytearray(min(chunk_size, size)))
+    remaining = size
+    while remaining:
+        view = buf[:min(remaining, len(buf))]
+        recv_into(sock, view, deadline)
+        remaining -= len(view)
+        # A failed write leaves the socket mid-response. Reading the rest
+        # would cost a full download for nothing, so the error is raised now.
+        fileobj.write(view)
+    return size
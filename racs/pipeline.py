@@ -1,5 +1,10 @@
+import os
+import uuid
+from typing import Optional
+
 from .socket import ConnectionPool
 from .command import Command
+from .pack import DEFAULT_CHUNK_SIZE
 
 class Pipeline(Command):
     """
@@ -10,7 +15,7 @@ class Pipeline(Command):
     pipe operator (`|>`) and executed as one compound command.
     """
 
-    def __init__(self, pool: ConnectionPool):
+    def __init__(self, pool: ConnectionPool, priority: Optional[str] = None, timeout: Optional[float] = None):
         """
         Initialize a new pipeline.
 
@@ -18,8 +23,12 @@ class Pipeline(Command):
         ----------
         pool : ConnectionPool
             Connection pool managing socket connections to the RACS server.
+        priority : str, optional
+            Priority class used when the pool has a :class:`Governor` attached.
+        timeout : float, optional
+            Default time budget in seconds for each execution.
         """
-        super().__init__(pool)
+        super().__init__(pool, priority, timeout)
         self._commands = []
 
     def gain(self, gain: float):
@@ -389,7 +398,7 @@ class Pipeline(Command):
         self._commands.append("SHUTDOWN")
         return self
 
-    def execute(self):
+    def execute(self, timeout: Optional[float] = None):
         """
         Execute all appended commands as a single pipeline.
 
@@ -397,13 +406,102 @@ class Pipeline(Command):
         ----------------------
         RANGE 'vocals' 0.0 30.0 |> ENCODE 'audio/wav'
 
+        Parameters
+        ----------
+        timeout : float, optional
+            Time budget in seconds for this call, overriding the default.
+
         Returns
         -------
         Any
             The unpacked response from the RACS server.
         """
         command = " |> ".join(self._commands)
-        return self.execute_command(command)
+        return self.execute_command(command, timeout)
+
+    def execute_iter(self, timeout: Optional[float] = None):
+        """
+        Execute the pipeline and decode a list response incrementally.
+
+        Items are yielded as soon as they are decoded from the socket, so
+        ``LIST '*'`` on a large server starts producing stream ids right away
+        and never holds the full list in memory. Responses that are not lists
+        are yielded as a single value. The pipeline is sent on the first call
+        to ``next`` and a pooled connection is held until the iterator is
+        exhausted or closed.
+
+        Example
+        -------
+        >>> for stream_id in r.pipeline().list("*").execute_iter():
+        ...     print(stream_id)
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time budget in seconds for the whole iteration, overriding the default.
+
+        Returns
+        -------
+        Iterator[Any]
+            The decoded list items.
+        """
+        request = " |> ".join(self._commands).encode() + b'\0'
+        return self._request_iter(request, timeout)
+
+    def execute_to(self, dest, chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: Optional[float] = None) -> int:
+        """
+        Execute the pipeline and stream the binary response to a file.
+
+        Unlike :meth:`execute`, the response is never held in memory. The
+        payload is copied from the socket to `dest` in chunks of `chunk_size`
+        bytes, so peak memory does not depend on the export length.
+
+        Example
+        -------
+        >>> r.pipeline().range("vocals", 0.0, 3600.0).encode("audio/wav").execute_to("vocals.wav")
+
+        Parameters
+        ----------
+        dest : str, os.PathLike or writable binary file
+            Path of the output file, or an object with a ``write`` method.
+            A path is written to a temporary file in the same directory and
+            renamed over `dest` only once the whole response was received,
+            so a failed export leaves an existing file untouched.
+        chunk_size : int, optional
+            Size of the copy buffer in bytes (defaults to 1 MB).
+        timeout : float, optional
+            Time budget in seconds for the whole transfer, overriding the default.
+
+        Returns
+        -------
+        int
+            Number of bytes written to `dest`.
+
+        Raises
+        ------
+        RacsException
+            If the server returned an error or a response without a binary payload.
+        """
+        request = " |> ".join(self._commands).encode() + b'\0'
+        if not isinstance(dest, (str, os.PathLike)):
+            return self._request_to(request, dest, chunk_size, timeout)
+
+        path = os.fspath(dest)
+        directory, name = os.path.split(path)
+        tmp = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+        # Created like open(dest, "wb") would, so the file gets the usual umask permissions.
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                n = self._request_to(request, f, chunk_size, timeout)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return n
 
     def reset(self):
         """
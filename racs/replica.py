@@ -0,0 +1,311 @@
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .command import Command, READ_COMMANDS
+from .governor import Governor
+from .pipeline import Pipeline
+from .socket import ConnectionPool, reusable
+from .stream import Stream
+
+
+DEFAULT_ALPHA = 0.2
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_WINDOW = 256
+MIN_HEDGE_SAMPLES = 20
+
+
+class Replica:
+    """
+    A RACS server in a replica set and its observed latency.
+
+    Attributes
+    ----------
+    host : str
+        Hostname or IP address of the server.
+    port : int
+        Port number of the server.
+    pool : ConnectionPool
+        Connections to the server.
+    ewma : float or None
+        Exponentially weighted moving average of request latency in seconds.
+    in_flight : int
+        Number of requests currently outstanding on the server.
+    """
+
+    def __init__(self, host: str, port: int, pool: ConnectionPool, alpha: float = DEFAULT_ALPHA):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.ewma = None
+        self.in_flight = 0
+        self._alpha = alpha
+        self._samples = deque(maxlen=DEFAULT_WINDOW)
+        self._lock = threading.Lock()
+
+    def score(self) -> tuple[float, int]:
+        """Expected wait for a new request, lower is better."""
+        with self._lock:
+            return (self.ewma or 0.0) * (self.in_flight + 1), self.in_flight
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the `p`-th percentile of recent latencies, or None if too few samples."""
+        with self._lock:
+            if len(self._samples) < MIN_HEDGE_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+    def call(self, fn):
+        """Run `fn` against this replica and record its latency."""
+        start = self._begin()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._end(start, reusable(e))
+            raise
+        self._end(start, True)
+        return result
+
+    def iterate(self, it):
+        """Yield from the response iterator `it` and record the latency of the whole iteration."""
+        start = self._begin()
+        try:
+            yield from it
+        except BaseException as e:
+            self._end(start, reusable(e))
+            raise
+        self._end(start, True)
+
+    def _begin(self) -> float:
+        with self._lock:
+            self.in_flight += 1
+        return time.monotonic()
+
+    def _end(self, start: float, answered: bool):
+        """Finish a request and record its latency."""
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self.in_flight -= 1
+            if not answered and self.ewma is not None:
+                # A timed out, cancelled or failed request only shows that the
+                # answer would have taken at least `elapsed`. Recording it as a
+                # censored sample moves reads away from a hung replica without
+                # letting a cancelled hedge make a replica look faster.
+                elapsed = max(elapsed, self.ewma)
+            self.ewma = elapsed if self.ewma is None else self._alpha * elapsed + (1 - self._alpha) * self.ewma
+            self._samples.append(elapsed)
+
+
+class RacsReplicaSet(Command):
+    """
+    Client for a primary RACS server and its read replicas.
+
+    Streams, raw commands and pipelines that write go to the primary.
+    Read-only pipelines go to the replica with the lowest EWMA latency
+    weighted by its in-flight requests. With hedging enabled, a read that
+    has not answered after the chosen replica's `hedge_percentile` latency
+    is duplicated to the next best replica, and whichever answers first wins.
+
+    Example
+    -------
+    >>> r = RacsReplicaSet(("racs-0", 6381), [("racs-1", 6381), ("racs-2", 6381)], hedge=True)
+    >>> r.stream("vocals").execute(data)
+    >>> r.pipeline().range("vocals", 0.0, 30.0).encode("audio/mp3").execute()
+    """
+
+    def __init__(self, primary: tuple[str, int], replicas: list[tuple[str, int]], pool_size: int = 3,
+                 governor: Optional[Governor] = None, hedge: bool = False,
+                 hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE, alpha: float = DEFAULT_ALPHA,
+                 timeout: Optional[float] = None):
+        """
+        Initialize a replica set client.
+
+        Parameters
+        ----------
+        primary : tuple[str, int]
+            ``(host, port)`` of the primary server.
+        replicas : list[tuple[str, int]]
+            ``(host, port)`` of every read replica. Reads use the primary if empty.
+        pool_size : int, optional
+            Number of socket connections to maintain per server (defaults to 3).
+        governor : Governor, optional
+            Scheduler shared by the pools of all servers.
+        hedge : bool, optional
+            Send a duplicate read to a second replica when the first is slow.
+        hedge_percentile : float, optional
+            Latency percentile of the first replica after which to hedge (defaults to 95).
+        alpha : float, optional
+            Smoothing factor of the latency EWMA (defaults to 0.2).
+        timeout : float, optional
+            Default time budget in seconds for every request.
+        """
+        host, port = primary
+        super().__init__(ConnectionPool(host, port, pool_size, governor), timeout=timeout)
+
+        self._replicas = [
+            Replica(h, p, ConnectionPool(h, p, pool_size, governor), alpha) for h, p in replicas
+        ] or [Replica(host, port, self._pool, alpha)]
+        self._hedge = hedge and len(self._replicas) > 1
+        self._hedge_percentile = hedge_percentile
+        self._executor = ThreadPoolExecutor(thread_name_prefix="racs-hedge") if self._hedge else None
+
+    @property
+    def replicas(self) -> list[Replica]:
+        """list[Replica]: The read replicas and their latency statistics."""
+        return list(self._replicas)
+
+    def ranked(self) -> list[Replica]:
+        """Return the read replicas, best first."""
+        return sorted(self._replicas, key=Replica.score)
+
+    def pipeline(self, priority: Optional[str] = None):
+        """
+        Create a new pipeline that sends reads to the fastest replica.
+
+        Returns
+        -------
+        ReplicaPipeline
+            A pipeline routed by whether its commands write.
+        """
+        return ReplicaPipeline(self, priority, self._timeout)
+
+    def stream(self, stream_id: str):
+        return Stream(self._pool, stream_id).timeout(self._timeout)
+
+    def read(self, prepare, run):
+        """
+        Run a read on the best replica, hedging if enabled.
+
+        The first attempt runs on the calling thread. A hedge is started on
+        a worker only after the first replica's `hedge_percentile` latency
+        has passed, and whichever attempt answers first cancels the other.
+
+        Parameters
+        ----------
+        prepare : Callable[[ConnectionPool], Command]
+            Returns the executor of one attempt on the given pool. Its
+            :meth:`Command.cancel` is used to stop the losing attempt.
+        run : Callable[[Command], Any]
+            Performs the request with a prepared executor.
+
+        Returns
+        -------
+        Any
+            The result of the first replica to answer.
+        """
+        ranked = self.ranked()
+        first = ranked[0]
+        primary = prepare(first.pool)
+        delay = first.percentile(self._hedge_percentile) if self._hedge else None
+        if delay is None:
+            return first.call(lambda: run(primary))
+
+        second = ranked[1]
+        hedge = prepare(second.pool)
+        lock = threading.Lock()
+        finished = False
+        future = None
+
+        def attempt():
+            if finished:
+                return None
+            result = second.call(lambda: run(hedge))
+            primary.cancel()
+            return result
+
+        def launch():
+            nonlocal future
+            with lock:
+                if not finished:
+                    future = self._executor.submit(attempt)
+
+        timer = threading.Timer(delay, launch)
+        timer.daemon = True
+        timer.start()
+        try:
+            result = first.call(lambda: run(primary))
+            error = None
+        except BaseException as e:
+            error = e
+        finally:
+            timer.cancel()
+            with lock:
+                finished = True
+
+        if future is None:
+            if error is not None:
+                raise error
+            return result
+
+        if error is None or reusable(error):
+            hedge.cancel()
+            if error is not None:
+                raise error
+            return result
+
+        # The first attempt failed or lost the race, use the hedge.
+        try:
+            return future.result()
+        except BaseException as e:
+            raise e if reusable(e) else error
+
+    def close(self):
+        """Close the connections to every server."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for replica in self._replicas:
+            if replica.pool is not self._pool:
+                replica.pool.close()
+        self._pool.close()
+
+
+class ReplicaPipeline(Pipeline):
+    """
+    Pipeline that sends read-only command chains to the fastest replica.
+
+    A pipeline is a read if every command in it is in ``READ_COMMANDS``.
+    Anything else, such as ``CREATE``, ``OPEN`` or ``EVAL``, runs on the primary.
+    """
+
+    def __init__(self, replica_set: RacsReplicaSet, priority: Optional[str] = None, timeout: Optional[float] = None):
+        super().__init__(replica_set._pool, priority, timeout)
+        self._replica_set = replica_set
+        self._attempts = weakref.WeakSet()
+
+    def is_read(self) -> bool:
+        """Return True if every command in the pipeline is read-only."""
+        return bool(self._commands) and all(c.split(" ", 1)[0] in READ_COMMANDS for c in self._commands)
+
+    def _on(self, pool: ConnectionPool) -> Pipeline:
+        # Each attempt gets its own deadlines so a hedge loser can be
+        # cancelled alone, cancel() on this pipeline reaches all of them.
+        pipeline = Pipeline(pool, self._priority, self._timeout)
+        pipeline._commands = list(self._commands)
+        self._attempts.add(pipeline)
+        return pipeline
+
+    def cancel(self):
+        for attempt in list(self._attempts):
+            attempt.cancel()
+        super().cancel()
+
+    def execute(self, timeout: Optional[float] = None):
+        if not self.is_read():
+            return super().execute(timeout)
+        return self._replica_set.read(self._on, lambda pipeline: pipeline.execute(timeout))
+
+    def execute_iter(self, timeout: Optional[float] = None):
+        if not self.is_read():
+            return super().execute_iter(timeout)
+        replica = self._replica_set.ranked()[0]
+        return replica.iterate(self._on(replica.pool).execute_iter(timeout))
+
+    def execute_to(self, dest, *args, **kwargs) -> int:
+        if not self.is_read():
+            return super().execute_to(dest, *args, **kwargs)
+        replica = self._replica_set.ranked()[0]
+        return replica.call(lambda: self._on(replica.pool).execute_to(dest, *args, **kwargs))
@@ -0,0 +1,105 @@
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from .deadline import Deadline
+from .excpetion import RacsException, RacsTimeoutError, RacsCancelledError
+
+
+class _Call:
+    """A request in flight and its outcome, shared by every caller waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent requests into one round trip.
+
+    The first caller for a key runs the request. Callers that arrive with the
+    same key while it is in flight wait for it and get the same response.
+    Nothing is kept after the request completes, so a later call always goes
+    to the server and never sees a stale answer.
+
+    Server errors are shared with the waiters. If the request fails because
+    of a timeout, cancellation or socket error, waiters are not failed along
+    with it. One of them runs the request again instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._hits = 0
+        self._misses = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], deadline: Optional[Deadline] = None):
+        """
+        Run `fn`, or wait for the identical call already in flight.
+
+        Parameters
+        ----------
+        key : Hashable
+            Identity of the request, e.g. the raw command bytes.
+        fn : Callable[[], Any]
+            Performs the request.
+        deadline : Deadline, optional
+            Bounds how long a waiter blocks and lets it be cancelled.
+
+        Returns
+        -------
+        Any
+            The response. Lists are copied for each waiter so callers cannot
+            see each other's changes.
+
+        Raises
+        ------
+        RacsTimeoutError
+            If `deadline` expires while waiting.
+        RacsCancelledError
+            If `deadline` is cancelled while waiting.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._misses += 1
+                else:
+                    self._hits += 1
+
+            if leader:
+                try:
+                    call.result = fn()
+                    return call.result
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    call.done.set()
+
+            while not call.done.wait(None if deadline is None else deadline.poll()):
+                pass
+
+            if call.error is None:
+                return list(call.result) if isinstance(call.result, list) else call.result
+            if isinstance(call.error, RacsException) and \
+                    not isinstance(call.error, (RacsTimeoutError, RacsCancelledError)):
+                raise call.error
+
+    def stats(self) -> dict:
+        """
+        Return coalescing counters.
+
+        Returns
+        -------
+        dict
+            ``hits`` calls served by a request already in flight, ``misses``
+            calls that went to the server, and ``in_flight`` requests.
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "in_flight": len(self._calls)}
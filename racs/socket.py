@@ -1,61 +1,215 @@
 import queue
+import select
 import threading
 import socket
 from typing import Optional
 
+from .deadline import Deadline
+from .excpetion import RacsException, RacsTimeoutError, RacsCancelledError, RacsProtocolError
+from .governor import Governor
+from .singleflight import SingleFlight
+from .transport import Transport, TcpTransport
+
 
 class ConnectionPool:
 
-    def __init__(self, host: str, port: int, size: int):
+    def __init__(self, host: Optional[str], port: Optional[int], size: int, governor: Optional[Governor] = None,
+                 transport: Optional[Transport] = None, singleflight: Optional[SingleFlight] = None):
         self._host = host
         self._port = port
+        self._transport = transport if transport is not None else TcpTransport(host, port)
         self._size = size
         self._pool = queue.Queue()
         self._lock = threading.Lock()
+        self._governor = governor
+        self._singleflight = singleflight
+        self._leases = {}
 
+        # Connections are opened on first use, under the deadline of the
+        # request that needs them, so an unreachable server cannot hang here.
         for _ in range(self._size):
-            self._pool.put(self.create_socket())
+            self._pool.put(None)
+
+        if self._governor is not None:
+            self._governor.attach(self._size, self)
+
+    @property
+    def governor(self) -> Optional[Governor]:
+        return self._governor
+
+    @property
+    def singleflight(self) -> Optional[SingleFlight]:
+        return self._singleflight
+
+    @property
+    def transport(self) -> Transport:
+        return self._transport
+
+    def create_socket(self, timeout: Optional[float] = None) -> socket.socket:
+        return self._transport.connect(timeout)
+
+    def _checkout(self, deadline: Optional[Deadline]) -> socket.socket:
+        while True:
+            try:
+                sock = self._pool.get(timeout=None if deadline is None else deadline.poll())
+                break
+            except queue.Empty:
+                pass
+
+        # Unused and discarded slots hold None and are connected on demand.
+        if sock is None:
+            try:
+                sock = self.create_socket(None if deadline is None else deadline.remaining())
+            except BaseException:
+                self._pool.put(None)
+                raise
+        return sock
+
+    def get(self, priority: Optional[str] = None, deadline: Optional[Deadline] = None):
+        if self._governor is None:
+            return self._checkout(deadline)
 
-    def create_socket(self) -> socket.socket:
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(None)
-        s.connect((self._host, self._port))
-        return s
+        self._governor.acquire(priority, deadline, self)
+        try:
+            sock = self._checkout(deadline)
+        except BaseException:
+            self._governor.release(priority, self)
+            raise
 
-    def get(self):
-        return self._pool.get()
+        with self._lock:
+            self._leases[sock] = priority
+        return sock
 
     def put(self, sock: socket.socket):
-        self._pool.put(sock)
+        self._release(sock, sock)
+
+    def discard(self, sock: socket.socket):
+        """Close a socket whose stream position is unknown and free its slot."""
+        try:
+            sock.close()
+        finally:
+            self._release(sock, None)
+
+    def _release(self, sock: socket.socket, slot: Optional[socket.socket]):
+        if self._governor is not None:
+            with self._lock:
+                priority = self._leases.pop(sock, None)
+            self._pool.put(slot)
+            self._governor.release(priority, self)
+            return
+
+        self._pool.put(slot)
+
+    def throttle(self, n: int, priority: Optional[str] = None, deadline: Optional[Deadline] = None):
+        if self._governor is not None:
+            self._governor.throttle(n, priority, deadline)
 
     def close(self):
         while not self._pool.empty():
             sock = self._pool.get()
-            sock.close()
+            if sock is not None:
+                sock.close()
+
+        if self._governor is not None:
+            self._governor.detach(self._size, self)
+            self._governor = None
+
+
+def _settimeout(sock: socket.socket, deadline: Optional[Deadline]):
+    sock.settimeout(None if deadline is None else deadline.remaining())
 
 
-def recv(sock: socket.socket, n: int):
+def _io(deadline: Optional[Deadline], fn, *args):
+    try:
+        return fn(*args)
+    except socket.timeout as e:
+        raise RacsTimeoutError("timed out waiting for the RACS server") from e
+    except OSError as e:
+        if deadline is not None and deadline.cancelled:
+            raise RacsCancelledError("request cancelled") from e
+        raise
+
+
+def _closed(deadline: Optional[Deadline]):
+    if deadline is not None and deadline.cancelled:
+        raise RacsCancelledError("request cancelled")
+    raise ConnectionError("socket closed before full response received")
+
+
+def recv(sock: socket.socket, n: int, deadline: Optional[Deadline] = None):
     buf = bytearray()
     while len(buf) < n:
-        chunk = sock.recv(n - len(buf))
+        _settimeout(sock, deadline)
+        chunk = _io(deadline, sock.recv, n - len(buf))
         if not chunk:
-            raise ConnectionError("socket closed before full header received")
+            _closed(deadline)
         buf.extend(chunk)
     return bytes(buf)
 
 
-def send(sock: socket.socket, request: bytes) -> Optional[bytes]:
-    try:
-        length = len(request)
-        request = length.to_bytes(8, "little") + request
-        sock.sendall(request)
+def recv_into(sock: socket.socket, buf: memoryview, deadline: Optional[Deadline] = None):
+    n = 0
+    while n < len(buf):
+        _settimeout(sock, deadline)
+        k = _io(deadline, sock.recv_into, buf[n:])
+        if not k:
+            _closed(deadline)
+        n += k
+
+
+def write_request(sock: socket.socket, request: bytes, deadline: Optional[Deadline] = None):
+    """Send a length-prefixed request without waiting for the response."""
+    length = len(request)
+    _settimeout(sock, deadline)
+    _io(deadline, sock.sendall, length.to_bytes(8, "little") + request)
+
+
+def recv_length(sock: socket.socket, deadline: Optional[Deadline] = None) -> int:
+    """Read the length prefix of the next response."""
+    header = recv(sock, 8, deadline)
+    return int.from_bytes(header, "little")
+
+
+def readable(sock: socket.socket) -> bool:
+    """Return True if a read on `sock` would not block."""
+    # select() fails for descriptors >= FD_SETSIZE, so prefer poll() where available.
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(sock, select.POLLIN)
+        return bool(poller.poll(0))
+    return bool(select.select([sock], [], [], 0)[0])
+
+
+def send_request(sock: socket.socket, request: bytes, deadline: Optional[Deadline] = None) -> int:
+    """Send a length-prefixed request and return the length of the response."""
+    write_request(sock, request, deadline)
+    return recv_length(sock, deadline)
+
+
+def send(sock: socket.socket, request: bytes, deadline: Optional[Deadline] = None) -> bytes:
+    """
+    Send a request and return the raw response.
+
+    Raises
+    ------
+    RacsTimeoutError
+        If the deadline expires, or the socket has its own timeout and it expires.
+    RacsCancelledError
+        If the deadline is cancelled.
+    """
+    length = send_request(sock, request, deadline)
+    return recv(sock, length, deadline)
 
-        header = recv(sock, 8)
-        length = int.from_bytes(header, "little")
 
-        response = recv(sock, length)
-        return response
+def reusable(e: BaseException) -> bool:
+    """
+    Return True if a socket is still at a response boundary after `e`.
 
-    except socket.timeout:
-        print("Timed out waiting for data")
-        return None
+    Server error responses are read in full, so the socket can go back to the
+    pool. Timeouts, cancellation, undecodable responses and socket errors
+    leave it mid-response.
+    """
+    if isinstance(e, GeneratorExit):
+        return True
+    return isinstance(e, RacsException) and \
+        not isinstance(e, (RacsTimeoutError, RacsCancelledError, RacsProtocolError))
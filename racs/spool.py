@@ -0,0 +1,491 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+import crc32c
+import msgpack
+
+from .command import Command
+from .excpetion import RacsException, RacsTimeoutError, RacsCancelledError
+from .pack import unpack
+from .socket import ConnectionPool, reusable
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 256 * 1024 * 1024
+DEFAULT_RETRY_INTERVAL = 0.1
+MAX_RETRY_INTERVAL = 5.0
+
+MAGIC = b"RSPL"
+VERSION = 1
+HEADER_SIZE = 4096
+
+KIND_PAD = 0
+KIND_BATCH = 1
+KIND_CLOSE = 2
+
+# magic, version, capacity, sequence, head, tail, crc
+_SLOT = struct.Struct("<4sHQQQQI")
+_SLOT_SIZE = 64
+# length, crc, kind, stream id length, timestamp
+_RECORD = struct.Struct("<IIBHd")
+
+_NULL = msgpack.packb(["null"], use_bin_type=True)
+
+# Errors that leave a record unsent, so it is sent again once the server is back.
+_RETRY = (OSError, RacsTimeoutError, RacsCancelledError)
+# META attributes that never change for a stream and are safe to cache.
+_STATIC_META = ("sample_rate", "channels", "bit_depth")
+
+
+class Spool:
+    """
+    Disk-backed queue of frame batches between producers and a RACS server.
+
+    Producers append packed, compressed batches and stream closes to a ring
+    buffer in a memory-mapped file and return immediately. A background
+    thread sends the records to the server in the order they were written,
+    sending ``OPEN`` before the first batch of each stream and retrying with
+    backoff while the server is unreachable. Batches that fail for any other
+    reason, e.g. because the server rejects them, are skipped and counted.
+
+    The file never grows past `capacity` bytes plus a 4 KB header. Head and
+    tail offsets are stored in two alternating checksummed header slots and
+    every record carries a CRC, so after a crash the spool resumes from the
+    last acknowledged record. A batch that was sent but not yet acknowledged
+    when the process died is sent again (at-least-once delivery). The same
+    applies to a batch whose request timed out, so with a `timeout` a slow
+    server can receive, and store, a batch twice.
+
+    Example
+    -------
+    >>> spool = r.spool("/var/spool/racs/vocals.spool")
+    >>> with r.stream("vocals").spool(spool).open() as writer:
+    ...     writer.write(samples)
+    >>> spool.stats()["lag"]
+    """
+
+    def __init__(self, pool: ConnectionPool, path: str, capacity: int = DEFAULT_CAPACITY, block: bool = False,
+                 sync: bool = False, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Open or create a spool file and start draining it.
+
+        Parameters
+        ----------
+        pool : ConnectionPool
+            The connection pool the drainer sends records with.
+        path : str
+            Path of the spool file. Unsent records in an existing file are
+            recovered and sent first.
+        capacity : int, optional
+            Size of the ring buffer in bytes (defaults to 256 MB). Must match
+            the capacity of an existing file.
+        block : bool, optional
+            Wait for space when the spool is full instead of raising
+            (defaults to False).
+        sync : bool, optional
+            ``msync`` after every write so records also survive power loss.
+            Without it, records survive a crash of the process but not of
+            the host (defaults to False).
+        priority : str, optional
+            Priority class used when the pool has a :class:`Governor` attached.
+        timeout : float, optional
+            Time budget in seconds for each request sent by the drainer. A
+            batch that times out is sent again, which duplicates its audio if
+            the server stored it after all. The drainer waits as long as
+            needed if omitted.
+
+        Raises
+        ------
+        RacsException
+            If an existing file has a different capacity.
+        """
+        self._pool = pool
+        self._path = path
+        self._capacity = capacity
+        self._block = block
+        self._sync = sync
+        self._priority = priority
+        self._timeout = timeout
+        self._command = Command(pool, priority, timeout)
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._meta = {}
+        self._opened = set()
+        self._stopping = False
+        self._stop = threading.Event()
+
+        self._seq = 0
+        self._head = 0
+        self._tail = 0
+        self._records = 0
+        self._recovered = 0
+        self._sent_records = 0
+        self._sent_bytes = 0
+        self._failed = 0
+        self._rejected = 0
+        self._retries = 0
+        self._corrupt = 0
+        self._last_error = None
+
+        self._file = open(path, "a+b")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size not in (0, HEADER_SIZE + capacity):
+                raise RacsException(f"spool file '{path}' has capacity {size - HEADER_SIZE}, expected {capacity}")
+            self._file.truncate(HEADER_SIZE + capacity)
+            self._mm = mmap.mmap(self._file.fileno(), HEADER_SIZE + capacity)
+        except BaseException:
+            self._file.close()
+            raise
+
+        self._recover()
+
+        self._thread = threading.Thread(target=self._run, name="racs-spool", daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"Spool({self._path!r}, capacity={self._capacity})"
+
+    def command(self, stream_id: str) -> Command:
+        """
+        Return an executor that writes the uploads of `stream_id` to this spool.
+
+        ``META`` answers for the sample rate, channels and bit depth are
+        fetched once per stream and cached, ``OPEN`` is
+        left to the drainer, and batches and ``CLOSE`` are appended to the
+        spool. Other commands go to the server.
+        """
+        return _SpoolCommand(self, stream_id)
+
+    def put(self, kind: int, stream_id: str, payload: bytes = b""):
+        """
+        Append a record to the spool.
+
+        Parameters
+        ----------
+        kind : int
+            ``KIND_BATCH`` for a frame batch request or ``KIND_CLOSE``.
+        stream_id : str
+            Stream the record belongs to.
+        payload : bytes, optional
+            The raw batch request, empty for ``KIND_CLOSE``.
+
+        Raises
+        ------
+        RacsException
+            If the spool is full and not blocking, the record is larger than
+            the spool, or the spool is closed.
+        """
+        sid = stream_id.encode()
+        size = _RECORD.size + len(sid) + len(payload)
+        if size > self._capacity:
+            raise RacsException(f"record of {size} bytes does not fit in a spool of {self._capacity} bytes")
+
+        with self._cond:
+            while True:
+                if self._stopping:
+                    raise RacsException("spool is closed")
+                pad = self._capacity - self._tail % self._capacity
+                if pad >= size:
+                    pad = 0
+                if self._tail + pad + size - self._head <= self._capacity:
+                    break
+                if not self._block:
+                    self._rejected += 1
+                    raise RacsException(f"spool '{self._path}' is full")
+                self._cond.wait()
+
+            if pad:
+                # The record does not fit before the end of the ring, skip to the start.
+                if pad >= _RECORD.size:
+                    self._write_record(self._tail, KIND_PAD, b"", b"\0" * (pad - _RECORD.size), 0.0)
+                self._tail += pad
+
+            self._write_record(self._tail, kind, sid, payload, time.time())
+            self._tail += size
+            self._records += 1
+            if self._sync:
+                self._mm.flush()
+            self._write_header()
+            if self._sync:
+                self._mm.flush()
+            self._cond.notify_all()
+
+    def meta(self, command: str):
+        """Return the answer to a ``META`` command for a static attribute, asking the server only once."""
+        with self._lock:
+            if command in self._meta:
+                return self._meta[command]
+        value = self._command.execute_command(command)
+        with self._lock:
+            self._meta[command] = value
+        return value
+
+    def stats(self) -> dict:
+        """
+        Return the spool state and drain metrics.
+
+        Returns
+        -------
+        dict
+            ``pending_records`` and ``pending_bytes`` not yet acknowledged,
+            ``capacity``, ``usage`` as a fraction of capacity, ``lag`` in
+            seconds since the oldest pending record was written, ``recovered``
+            records found on open, ``sent_records``, ``sent_bytes``, ``failed``
+            records that could not be sent, ``rejected`` writes to a full
+            spool, ``corrupt`` records dropped because they failed their
+            checksum, ``retries`` and ``last_error``.
+        """
+        with self._lock:
+            lag = 0.0
+            if self._records:
+                lag = max(0.0, time.time() - self._oldest())
+            return {
+                "pending_records": self._records,
+                "pending_bytes": self._tail - self._head,
+                "capacity": self._capacity,
+                "usage": (self._tail - self._head) / self._capacity,
+                "lag": lag,
+                "recovered": self._recovered,
+                "sent_records": self._sent_records,
+                "sent_bytes": self._sent_bytes,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "retries": self._retries,
+                "corrupt": self._corrupt,
+                "last_error": None if self._last_error is None else str(self._last_error),
+            }
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every record written so far has been acknowledged.
+
+        Returns
+        -------
+        bool
+            True if the spool drained, False if `timeout` passed first.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._records:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, drain: bool = True, timeout: Optional[float] = None):
+        """
+        Stop the drainer and close the file.
+
+        Parameters
+        ----------
+        drain : bool, optional
+            Wait until pending records are sent first (defaults to True).
+            Records left in the spool are sent when it is opened again.
+        timeout : float, optional
+            Maximum time in seconds to wait for draining.
+        """
+        if drain:
+            self.flush(timeout)
+
+        with self._cond:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        self._stop.set()
+        self._command.cancel()
+        self._thread.join()
+
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _write_record(self, offset: int, kind: int, sid: bytes, payload: bytes, timestamp: float):
+        pos = HEADER_SIZE + offset % self._capacity
+        body = sid + payload
+        crc = crc32c.crc32c(_RECORD.pack(len(payload), 0, kind, len(sid), timestamp) + body)
+        self._mm[pos:pos + _RECORD.size] = _RECORD.pack(len(payload), crc, kind, len(sid), timestamp)
+        self._mm[pos + _RECORD.size:pos + _RECORD.size + len(body)] = body
+
+    def _read_record(self, offset: int) -> Optional[tuple[int, int, str, bytes, float]]:
+        """Return ``(size, kind, stream_id, payload, timestamp)`` at `offset`, or None if corrupt."""
+        pos = HEADER_SIZE + offset % self._capacity
+        length, crc, kind, sid_len, timestamp = _RECORD.unpack_from(self._mm, pos)
+        size = _RECORD.size + sid_len + length
+        if offset % self._capacity + size > self._capacity:
+            return None
+        body = self._mm[pos + _RECORD.size:pos + size]
+        if crc32c.crc32c(_RECORD.pack(length, 0, kind, sid_len, timestamp) + body) != crc:
+            return None
+        return size, kind, body[:sid_len].decode(), body[sid_len:], timestamp
+
+    def _next(self, offset: int) -> int:
+        """Skip the padding at the end of the ring, if any, starting at `offset`."""
+        pad = self._capacity - offset % self._capacity
+        if pad < _RECORD.size:
+            return offset + pad
+        if self._mm[HEADER_SIZE + offset % self._capacity + 8] == KIND_PAD:
+            record = self._read_record(offset)
+            if record is not None:
+                return offset + record[0]
+        return offset
+
+    def _oldest(self) -> float:
+        """Return the write time of the oldest pending record."""
+        offset = self._next(self._head)
+        return _RECORD.unpack_from(self._mm, HEADER_SIZE + offset % self._capacity)[4]
+
+    def _write_header(self):
+        self._seq += 1
+        fields = (MAGIC, VERSION, self._capacity, self._seq, self._head, self._tail)
+        data = _SLOT.pack(*fields, 0)
+        data = _SLOT.pack(*fields, crc32c.crc32c(data[:-4]))
+        slot = (self._seq % 2) * _SLOT_SIZE
+        self._mm[slot:slot + _SLOT.size] = data
+
+    def _recover(self):
+        """Load the newest valid header slot and drop torn records after the last intact one."""
+        best = None
+        for slot in (0, _SLOT_SIZE):
+            magic, version, capacity, seq, head, tail, crc = _SLOT.unpack_from(self._mm, slot)
+            if magic != MAGIC or version != VERSION or capacity != self._capacity:
+                continue
+            if crc32c.crc32c(self._mm[slot:slot + _SLOT.size - 4]) != crc:
+                continue
+            if best is None or seq > best[0]:
+                best = seq, head, tail
+
+        if best is None:
+            self._write_header()
+            return
+
+        self._seq, self._head, self._tail = best
+        offset = self._head
+        while True:
+            offset = self._next(offset)
+            if offset >= self._tail:
+                break
+            record = self._read_record(offset)
+            if record is None:
+                break
+            offset += record[0]
+            self._records += 1
+
+        self._tail = min(self._tail, offset)
+        self._recovered = self._records
+        self._write_header()
+
+    def _run(self):
+        retry = DEFAULT_RETRY_INTERVAL
+        while True:
+            with self._cond:
+                while not self._records and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                offset = self._next(self._head)
+                record = self._read_record(offset)
+                if record is None:
+                    # Record boundaries past a corrupt record are unknown, so
+                    # everything up to the tail is dropped.
+                    log.error("spool '%s': corrupt record at offset %d, dropping %d pending records",
+                              self._path, offset, self._records)
+                    self._corrupt += self._records
+                    self._head = self._tail = 0
+                    self._records = 0
+                    self._write_header()
+                    self._cond.notify_all()
+                    continue
+                size, kind, stream_id, payload, _ = record
+
+            try:
+                self._deliver(kind, stream_id, payload)
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                self._last_error = e
+                if isinstance(e, _RETRY):
+                    # The server is unreachable or timed out, send the record again.
+                    self._retries += 1
+                    self._opened.clear()
+                    self._stop.wait(retry)
+                    retry = min(retry * 2, MAX_RETRY_INTERVAL)
+                    continue
+                self._failed += 1
+            else:
+                self._sent_records += 1
+                self._sent_bytes += len(payload)
+            retry = DEFAULT_RETRY_INTERVAL
+
+            with self._cond:
+                self._head = offset + size
+                self._records -= 1
+                if not self._records:
+                    # Start over at the beginning of the ring while it is empty.
+                    self._head = self._tail = 0
+                self._write_header()
+                self._cond.notify_all()
+
+    def _deliver(self, kind: int, stream_id: str, payload: bytes):
+        if kind == KIND_BATCH:
+            if stream_id not in self._opened:
+                try:
+                    self._command.execute_command(f"OPEN '{stream_id}'")
+                except RacsException as e:
+                    # The stream may still be open from before a reconnect.
+                    if not reusable(e):
+                        raise
+                self._opened.add(stream_id)
+            unpack(self._command._request(payload))
+        elif kind == KIND_CLOSE:
+            self._opened.discard(stream_id)
+            self._command.execute_command(f"CLOSE '{stream_id}'")
+
+
+class _SpoolCommand(Command):
+    """Executor that appends the uploads of one stream to a :class:`Spool`."""
+
+    def __init__(self, spool: Spool, stream_id: str):
+        super().__init__(spool._pool, spool._priority, spool._timeout)
+        self._spool = spool
+        self._stream_id = stream_id
+
+    def execute_command(self, command: str, timeout: Optional[float] = None):
+        args = command.split(" ")
+        op = args[0]
+        if op == "META" and args[-1].strip("'") in _STATIC_META:
+            return self._spool.meta(command)
+        if op == "OPEN":
+            return None
+        if op == "CLOSE":
+            self._spool.put(KIND_CLOSE, self._stream_id)
+            return None
+        return super().execute_command(command, timeout)
+
+    def _request(self, request: bytes, timeout: Optional[float] = None) -> bytes:
+        if request.startswith(b"rsp"):
+            self._spool.put(KIND_BATCH, self._stream_id, request)
+            return _NULL
+        return super()._request(request, timeout)
+
+    def _request_window(self, requests, window: int, timeout: Optional[float] = None) -> int:
+        sent = 0
+        for request in requests:
+            self._request(request, timeout)
+            sent += 1
+        return sent
@@ -2,8 +2,21 @@ from .command import Command
 from .pack import unpack
 from .excpetion import RacsException
 from .frame import Frame
-from .socket import ConnectionPool, send
-from .utils import chunk, pack
+from .socket import ConnectionPool
+from .utils import chunk, pack, session_id
+from .wav import is_wav, parse_wav
+from .convert import is_array, to_pcm
+from .tune import AutoTuner, Tuning
+from .spool import Spool
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import itertools
+import mmap
+import os
+import threading
+import time
+import traceback
 import zstandard as zstd
 import msgpack
 
@@ -11,6 +24,15 @@ import msgpack
 DEFAULT_CHUNK_SIZE = 1024 * 32
 DEFAULT_BATCH_SIZE = 50
 DEFAULT_COMPRESSION_LEVEL = 3
+DEFAULT_LATENCY = 0.02
+
+
+def _send_frames(command: Command, frames: list[bytes]):
+    """Send a batch of packed frames and raise if the server rejects it."""
+    buf = bytearray(b"rsp")
+    buf.extend(msgpack.packb(frames, use_bin_type=True))
+
+    unpack(command._request(bytes(buf)))
 
 
 class Stream:
@@ -37,6 +59,15 @@ class Stream:
         self._batch_size : int = DEFAULT_BATCH_SIZE
         self._compression : bool = True
         self._compression_level : int = DEFAULT_COMPRESSION_LEVEL
+        self._priority : Optional[str] = None
+        self._latency : float = DEFAULT_LATENCY
+        self._timeout : Optional[float] = None
+        self._dither : bool = False
+        self._stripes : int = 1
+        self._auto_tune : bool = False
+        self._latency_target : Optional[float] = None
+        self._tuner : Optional[AutoTuner] = None
+        self._spool : Optional[Spool] = None
 
     def stream_id(self, stream_id: str):
         self._stream_id = stream_id
@@ -58,7 +89,109 @@ class Stream:
         self._compression_level = compression_level
         return self
 
+    def priority(self, priority: str):
+        self._priority = priority
+        return self
+
+    def timeout(self, timeout: Optional[float]):
+        self._timeout = timeout
+        return self
+
+    def stripes(self, stripes: int):
+        """
+        Encode batches on `stripes` threads and keep up to `stripes` batches in flight.
+
+        Framing and compression run in parallel, and batches are sent back
+        to back on one connection without waiting for each acknowledgement.
+        Batches reach the server in order because frames carry no sequence
+        number. All acknowledgements are received before ``CLOSE``.
+        """
+        if stripes < 1:
+            raise RacsException("'stripes' must be >= 1")
+        self._stripes = stripes
+        return self
+
+    def auto_tune(self, auto_tune: bool = True, latency_target: Optional[float] = None):
+        """
+        Choose `chunk_size` and `batch_size` from the measured link instead of the set values.
+
+        The RTT is probed with ``PING`` and throughput is measured on every
+        flush. Frames use the largest aligned size that fits 0xffff bytes
+        after compression, and batches grow until the round trip is a small share of each flush.
+        With `latency_target`, every batch must also be acknowledged within
+        that many seconds. Measurements are cached per host, see :meth:`tuning`.
+        """
+        self._auto_tune = auto_tune
+        self._latency_target = latency_target
+        return self
+
+    def tuning(self) -> Optional[Tuning]:
+        """Return the tuning chosen by the last auto-tuned upload, or None."""
+        return self._tuner.tuning if self._tuner is not None else None
+
+    def spool(self, spool: Optional[Spool]):
+        """
+        Write batches to a disk-backed :class:`Spool` instead of the server.
+
+        Uploads return as soon as their batches are on disk, and the spool
+        sends them in the background. The stream format is fetched from the
+        server once per stream and cached by the spool.
+        """
+        self._spool = spool
+        return self
+
+    def dither(self, dither: bool):
+        self._dither = dither
+        return self
+
+    def latency(self, latency: float):
+        self._latency = latency
+        return self
+
+    def open(self):
+        """
+        Open the stream for live writing.
+
+        Returns
+        -------
+        StreamWriter
+            A writer that keeps the stream open and sends frames as samples
+            arrive. Batches are flushed when `batch_size` frames are ready or
+            when the oldest buffered sample is `latency` seconds old.
+        """
+        writer = StreamWriter(
+            self._pool,
+            self._stream_id,
+            self._chunk_size,
+            self._batch_size,
+            self._compression,
+            self._compression_level,
+            self._latency,
+            self._priority,
+            self._timeout,
+            self._spool,
+            self._dither
+        )
+        writer.open()
+        return writer
+
     def execute(self, data: list[int]):
+        """
+        Send samples to the stream.
+
+        Parameters
+        ----------
+        data : list[int], numpy.ndarray or sequence of numpy.ndarray
+            Raw PCM integers interleaved by channel, or numpy samples. numpy
+            input may be float (full scale at 1.0) or integer, either 1-D
+            interleaved, 2-D of shape ``(frames, channels)``, or one array
+            per channel. It is interleaved, scaled, clipped and optionally
+            dithered to the stream's bit depth with vectorized operations.
+        """
+        if is_array(data):
+            self._stream_array(data)
+            return
+
         self._stream(
             self._stream_id,
             self._chunk_size,
@@ -92,43 +225,116 @@ class Stream:
         RacsException
           If `chunk_size` is negative or exceeds 0xffff.
         """
-        command = Command(self._pool)
+        command = self._executor()
         bit_depth = command.execute_command(f"META '{stream_id}' 'bit_depth'")
+        channels = command.execute_command(f"META '{stream_id}' 'channels'")
 
         command.execute_command(f"OPEN '{stream_id}'")
 
+        chunk_size, batch_size = self._sizes(command, channels * (bit_depth // 8), chunk_size, batch_size)
         if chunk_size < 0 or chunk_size > 0xffff:
             raise RacsException("'chunk_size' must be >= 0 or <= 0xffff")
 
+        n = chunk_size // (bit_depth // 8)
+        blocks = (pack(chunk_, bit_depth) for chunk_ in chunk(pcm_data, n))
+
+        self._send_blocks(command, stream_id, blocks, batch_size, compression, compression_level)
+        command.execute_command(f"CLOSE '{stream_id}'")
+
+    def _stream_array(self, data):
+        """Convert numpy samples to the stream's format and send them as RACS frames."""
+        if self._chunk_size < 0 or self._chunk_size > 0xffff:
+            raise RacsException("'chunk_size' must be >= 0 or <= 0xffff")
+
+        stream_id = self._stream_id
+        command = self._executor()
+        bit_depth = command.execute_command(f"META '{stream_id}' 'bit_depth'")
+        channels = command.execute_command(f"META '{stream_id}' 'channels'")
+
+        pcm = memoryview(to_pcm(data, bit_depth, channels, self._dither))
+
+        block_align = channels * (bit_depth // 8)
+        chunk_size, batch_size = self._sizes(command, block_align, self._chunk_size, self._batch_size)
+        n = chunk_size - chunk_size % block_align
+        if n == 0:
+            raise RacsException("'chunk_size' is smaller than one sample frame")
+
+        command.execute_command(f"OPEN '{stream_id}'")
+
+        blocks = (pcm[i:i + n] for i in range(0, len(pcm), n))
+        self._send_blocks(
+            command,
+            stream_id,
+            blocks,
+            batch_size,
+            self._compression,
+            self._compression_level
+        )
+        command.execute_command(f"CLOSE '{stream_id}'")
+
+    def _executor(self) -> Command:
+        """Return the executor for an upload, writing to the spool if one is set."""
+        if self._spool is not None:
+            return self._spool.command(self._stream_id)
+        return Command(self._pool, self._priority, self._timeout)
+
+    def _sizes(self, command: Command, block_align: int, chunk_size: int, batch_size: int) -> tuple[int, int]:
+        """Return the chunk and batch size to use, probing the link when auto-tuning."""
+        if not self._auto_tune or self._spool is not None:
+            self._tuner = None
+            return chunk_size, batch_size
+
+        self._tuner = AutoTuner(str(self._pool.transport), self._latency_target)
+        self._tuner.probe(command)
+        return self._tuner.chunk_size(block_align), self._tuner.batch_size()
+
+    def _send_blocks(self, command: Command, stream_id: str, blocks, batch_size: int, compression: bool, compression_level: int):
+        """
+        Wrap packed PCM blocks in frames and send them in batches.
+
+        Parameters
+        ----------
+        command : Command
+          Executor used to send the batches.
+        stream_id : str
+          Unique identifier of the stream. ASCII string.
+        blocks : Iterable[bytes-like]
+          Packed little-endian PCM blocks, at most 0xffff bytes each.
+        batch_size : int
+          Number of frames to send in each batch.
+        compression : bool
+          Compression flag.
+        compression_level : int
+          Level of compression.
+        """
+        if self._stripes > 1:
+            self._send_blocks_striped(command, stream_id, blocks, batch_size, compression, compression_level)
+            if self._tuner is not None:
+                self._tuner.save()
+            return
+
+        tuner = self._tuner
+
         frame = Frame()
         frame.stream_id = stream_id
         frame.flags = compression
 
         cctx = zstd.ZstdCompressor(level=compression_level)
-
-        n = chunk_size // (bit_depth // 8)
         frames = []
 
         def flush():
-            nonlocal frames
+            nonlocal frames, batch_size
             if len(frames) == 0:
                 return
 
-            sock = self._pool.get()
-            try:
-                buf = bytearray(b"rsp")
-                buf.extend(msgpack.packb(frames, use_bin_type=True))
-
-                resp = send(sock, bytes(buf))
-                unpack(resp)
-            finally:
-                self._pool.put(sock)
-
+            start = time.monotonic()
+            _send_frames(command, frames)
+            if tuner is not None:
+                elapsed = time.monotonic() - start
+                batch_size = tuner.observe(sum(map(len, frames)), len(frames), elapsed)
             frames.clear()
 
-        for chunk_ in chunk(pcm_data, n):
-            data = pack(chunk_, bit_depth)
-
+        for data in blocks:
             if compression:
                 frame.data = cctx.compress(data)
             else:
@@ -136,8 +342,383 @@ class Stream:
 
             frames.append(frame.pack())
 
-            if len(frames) == batch_size:
+            if len(frames) >= batch_size:
                 flush()
 
         flush()
+        if tuner is not None:
+            tuner.save()
+
+    def _send_blocks_striped(self, command: Command, stream_id: str, blocks, batch_size: int, compression: bool, compression_level: int):
+        """
+        Send packed PCM blocks with parallel encoding and a window of in-flight batches.
+
+        Each batch is framed and compressed on a worker thread (zstd releases
+        the GIL). Encoded batches are handed to :meth:`Command._request_window`
+        in their original order.
+        """
+        session = session_id()
+        local = threading.local()
+
+        def encode(batch):
+            cctx = getattr(local, "cctx", None)
+            if cctx is None:
+                cctx = local.cctx = zstd.ZstdCompressor(level=compression_level)
+
+            frame = Frame(session)
+            frame.stream_id = stream_id
+            frame.flags = compression
+
+            frames = []
+            for data in batch:
+                frame.data = cctx.compress(data) if compression else data
+                frames.append(frame.pack())
+
+            buf = bytearray(b"rsp")
+            buf.extend(msgpack.packb(frames, use_bin_type=True))
+            return bytes(buf)
+
+        blocks = iter(blocks)
+        with ThreadPoolExecutor(max_workers=self._stripes, thread_name_prefix="racs-stripe") as executor:
+            def requests():
+                # Encode at most two batches per worker ahead of the sender.
+                pending = deque()
+                while True:
+                    batch = list(itertools.islice(blocks, batch_size))
+                    if batch:
+                        pending.append(executor.submit(encode, batch))
+                    if pending and (not batch or len(pending) >= 2 * self._stripes):
+                        yield pending.popleft().result()
+                    if not batch and not pending:
+                        return
+
+            command._request_window(requests(), self._stripes)
+
+    def execute_file(self, path: str):
+        """
+        Send a WAV or raw PCM file without decoding it to Python ints.
+
+        The file is memory-mapped and frame payloads are sliced directly from
+        the mapping. WAV headers are validated against the stream's
+        ``sample_rate``, ``channels`` and ``bit_depth``. Files without a
+        RIFF/WAVE header are treated as raw little-endian PCM in the stream's
+        format.
+
+        Parameters
+        ----------
+        path : str
+            Path of the WAV or raw PCM file.
+
+        Raises
+        ------
+        RacsException
+            If the file format does not match the stream, or `chunk_size`
+            is negative or exceeds 0xffff.
+        """
+        if self._chunk_size < 0 or self._chunk_size > 0xffff:
+            raise RacsException("'chunk_size' must be >= 0 or <= 0xffff")
+
+        stream_id = self._stream_id
+        command = self._executor()
+        meta = {
+            attr: command.execute_command(f"META '{stream_id}' '{attr}'")
+            for attr in ("sample_rate", "channels", "bit_depth")
+        }
+
+        block_align = meta["channels"] * (meta["bit_depth"] // 8)
+        chunk_size, batch_size = self._sizes(command, block_align, self._chunk_size, self._batch_size)
+        n = chunk_size - chunk_size % block_align
+        if n == 0:
+            raise RacsException("'chunk_size' is smaller than one sample frame")
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                command.execute_command(f"OPEN '{stream_id}'")
+                command.execute_command(f"CLOSE '{stream_id}'")
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if is_wav(mm):
+                    info = parse_wav(mm)
+                    for attr in ("sample_rate", "channels", "bit_depth"):
+                        if getattr(info, attr) != meta[attr]:
+                            raise RacsException(
+                                f"WAV {attr} {getattr(info, attr)} does not match stream {attr} {meta[attr]}"
+                            )
+                    start, end = info.offset, info.offset + info.size
+                else:
+                    start, end = 0, len(mm) - len(mm) % block_align
+
+                command.execute_command(f"OPEN '{stream_id}'")
+
+                view = memoryview(mm)
+                try:
+                    blocks = (view[i:min(i + n, end)] for i in range(start, end, n))
+                    self._send_blocks(
+                        command,
+                        stream_id,
+                        blocks,
+                        batch_size,
+                        self._compression,
+                        self._compression_level
+                    )
+                    del blocks
+                except BaseException as e:
+                    # Frames in the traceback still hold slices of the
+                    # mapping, which would stop it from being closed.
+                    traceback.clear_frames(e.__traceback__)
+                    raise
+                finally:
+                    view.release()
+
         command.execute_command(f"CLOSE '{stream_id}'")
+
+class StreamWriter:
+    """
+    Long-lived writer for live capture into an open RACS stream.
+
+    Samples passed to :meth:`write` are buffered and packed into frames of
+    `chunk_size` bytes. A background thread sends a batch as soon as
+    `batch_size` frames are ready or the oldest buffered sample has waited
+    `latency` seconds, whichever comes first. On a deadline flush any partial
+    frame is sent as well, so small capture buffers never wait for a full
+    frame. Heavy traffic is still batched.
+
+    Writers are created with :meth:`Stream.open` and should be closed with
+    :meth:`close`, or used as a context manager.
+    """
+
+    def __init__(self, pool: ConnectionPool, stream_id: str, chunk_size: int, batch_size: int,
+                 compression: bool, compression_level: int, latency: float, priority: Optional[str] = None,
+                 timeout: Optional[float] = None, spool: Optional[Spool] = None, dither: bool = False):
+        """
+        Initialize a stream writer.
+
+        Parameters
+        ----------
+        pool : ConnectionPool
+            Pool used to manage socket connections to the RACS server.
+        stream_id : str
+            Unique identifier of the stream. ASCII string.
+        chunk_size : int
+            Size of pcm block in bytes. Must be >= 0 or <= 0xffff.
+        batch_size : int
+            Number of frames that triggers an immediate flush.
+        compression : bool
+            Compression flag.
+        compression_level : int
+            Level of compression.
+        latency : float
+            Maximum time in seconds a sample may be buffered before it is sent.
+        priority : str, optional
+            Priority class used when the pool has a :class:`Governor` attached.
+        timeout : float, optional
+            Time budget in seconds for each request sent by the writer.
+        spool : Spool, optional
+            Write batches to this spool instead of sending them directly.
+        dither : bool, optional
+            Add TPDF dither when quantizing float numpy samples.
+        """
+        if chunk_size < 0 or chunk_size > 0xffff:
+            raise RacsException("'chunk_size' must be >= 0 or <= 0xffff")
+
+        self._command = spool.command(stream_id) if spool is not None else Command(pool, priority, timeout)
+        self._stream_id = stream_id
+        self._chunk_size = chunk_size
+        self._batch_size = batch_size
+        self._compression = compression
+        self._latency = latency
+        self._dither = dither
+
+        self._frame = Frame()
+        self._frame.stream_id = stream_id
+        self._frame.flags = compression
+        self._cctx = zstd.ZstdCompressor(level=compression_level)
+
+        self._bit_depth = 0
+        self._channels = 1
+        self._block_align = 1
+        self._chunk_bytes = 0
+        self._pcm = bytearray()
+        self._frames = []
+        self._deadline = None
+        self._error = None
+        self._sending = False
+        self._closed = True
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def open(self):
+        """
+        Fetch the stream format, send OPEN and start the flush thread.
+
+        Raises
+        ------
+        RacsException
+            If the stream's bit depth is not 16 or 24, or `chunk_size` is
+            smaller than one sample frame of the stream.
+        """
+        self._bit_depth = self._command.execute_command(f"META '{self._stream_id}' 'bit_depth'")
+        self._channels = self._command.execute_command(f"META '{self._stream_id}' 'channels'")
+
+        if self._bit_depth not in (16, 24):
+            raise RacsException(f"unsupported bit depth {self._bit_depth}")
+
+        self._block_align = self._channels * (self._bit_depth // 8)
+        if self._chunk_size < self._block_align:
+            raise RacsException(f"'chunk_size' must be at least one sample frame ({self._block_align} bytes)")
+        self._chunk_bytes = self._chunk_size - self._chunk_size % self._block_align
+
+        self._command.execute_command(f"OPEN '{self._stream_id}'")
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"racs-writer-{self._stream_id}", daemon=True)
+        self._thread.start()
+
+    def _encode(self, n: int) -> bytes:
+        """Pack the first `n` buffered PCM bytes into a frame."""
+        data = bytes(self._pcm[:n])
+        del self._pcm[:n]
+        self._frame.data = self._cctx.compress(data) if self._compression else data
+        return self._frame.pack()
+
+    def _whole(self) -> int:
+        """Return the number of buffered bytes that form whole sample frames."""
+        return len(self._pcm) - len(self._pcm) % self._block_align
+
+    def write(self, samples: list[int]):
+        """
+        Buffer PCM samples for sending.
+
+        Parameters
+        ----------
+        samples : list[int] or numpy.ndarray
+            Raw PCM samples interleaved by channel, or numpy samples in any
+            layout accepted by :meth:`Stream.execute`. numpy samples are
+            converted with vectorized operations and never become Python ints.
+
+        Raises
+        ------
+        RacsException
+            If the writer is closed or a previous flush failed.
+        """
+        if is_array(samples):
+            pcm = to_pcm(samples, self._bit_depth, self._channels, self._dither)
+        else:
+            pcm = pack(samples, self._bit_depth)
+
+        with self._cond:
+            self._check()
+            if not pcm:
+                return
+
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self._latency
+
+            self._pcm += pcm
+            while len(self._pcm) >= self._chunk_bytes:
+                self._frames.append(self._encode(self._chunk_bytes))
+
+            self._cond.notify()
+
+    def flush(self):
+        """Block until everything buffered so far has been sent, including a partial frame."""
+        with self._cond:
+            self._check()
+            self._deadline = time.monotonic()
+            self._cond.notify_all()
+            while self._error is None and (self._sending or self._frames or self._whole()):
+                self._cond.wait()
+            self._check()
+
+    def close(self):
+        """
+        Flush buffered samples, stop the flush thread and send CLOSE.
+
+        Raises
+        ------
+        RacsException
+            If the samples written do not end on a sample frame boundary.
+            The trailing partial sample frame is dropped, so later appends to
+            the stream stay aligned.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+        self._command.execute_command(f"CLOSE '{self._stream_id}'")
+
+        dropped = len(self._pcm) // (self._bit_depth // 8)
+        self._pcm.clear()
+        if dropped:
+            raise RacsException(
+                f"dropped {dropped} trailing samples that do not fill a sample frame of {self._channels} channels"
+            )
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise RacsException("stream writer is closed")
+
+    def _take(self) -> Optional[list[bytes]]:
+        """Wait until a batch is due and return it, or None when closed and drained."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                due = self._closed or (self._deadline is not None and now >= self._deadline)
+
+                if len(self._frames) >= self._batch_size or (due and (self._frames or self._whole())):
+                    break
+                if self._closed:
+                    return None
+                if due:
+                    self._deadline = None
+                    continue
+
+                self._cond.wait(None if self._deadline is None else self._deadline - now)
+
+            if due:
+                # Only whole sample frames are sent. A trailing partial sample
+                # frame waits for more data, and is dropped by close().
+                m = self._whole()
+                if m:
+                    self._frames.append(self._encode(m))
+
+            frames = self._frames[:self._batch_size]
+            del self._frames[:self._batch_size]
+
+            if due and not self._frames:
+                self._deadline = time.monotonic() + self._latency if self._whole() else None
+
+            self._sending = True
+            return frames
+
+    def _run(self):
+        try:
+            while True:
+                frames = self._take()
+                if frames is None:
+                    return
+                _send_frames(self._command, frames)
+
+                with self._cond:
+                    self._sending = False
+                    self._cond.notify_all()
+        except BaseException as e:
+            with self._cond:
+                self._error = e
+                self._sending = False
+                self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,228 @@
+import threading
+import time
+from typing import Optional
+
+from .command import Command
+
+
+MAX_BLOCK_SIZE = 0xffff
+MAX_BATCH_SIZE = 4096
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_ALPHA = 0.3
+RTT_SHARE = 0.1
+PROBES = 3
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _compress_bound(n: int) -> int:
+    """Worst-case size of `n` bytes after zstd compression (``ZSTD_COMPRESSBOUND``)."""
+    return n + (n >> 8) + ((128 * 1024 - n) >> 11 if n < 128 * 1024 else 0)
+
+
+def _max_chunk_size() -> int:
+    n = MAX_BLOCK_SIZE
+    while _compress_bound(n) > MAX_BLOCK_SIZE:
+        n -= 1
+    return n
+
+
+# Largest payload whose compressed form always fits the 0xffff block limit,
+# even for noise-like audio that zstd cannot shrink.
+MAX_CHUNK_SIZE = _max_chunk_size()
+
+
+class Tuning:
+    """
+    Measured link characteristics of a server and the sizes chosen for them.
+
+    Attributes
+    ----------
+    host : str
+        Address of the server, e.g. ``"localhost:6381"``.
+    rtt : float or None
+        Round trip time of ``PING`` in seconds.
+    bandwidth : float or None
+        Smoothed upload throughput per flush in bytes/s.
+    chunk_size : int or None
+        Chosen frame payload size in bytes.
+    batch_size : int
+        Chosen number of frames per batch.
+    latency_target : float or None
+        Upper bound on the round trip of one batch in seconds.
+    flushes : int
+        Number of batches measured.
+    """
+
+    def __init__(self, host: str, latency_target: Optional[float] = None):
+        self.host = host
+        self.rtt = None
+        self.bandwidth = None
+        self.chunk_size = None
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.latency_target = latency_target
+        self.flushes = 0
+
+    def __repr__(self):
+        return f"Tuning({self.as_dict()!r})"
+
+    def as_dict(self) -> dict:
+        """Return the tuning as a plain dict, e.g. for logging."""
+        return {
+            "host": self.host,
+            "rtt": self.rtt,
+            "bandwidth": self.bandwidth,
+            "chunk_size": self.chunk_size,
+            "batch_size": self.batch_size,
+            "latency_target": self.latency_target,
+            "flushes": self.flushes,
+        }
+
+
+def cached(host: str) -> Optional[Tuning]:
+    """Return the last tuning measured for `host`, or None."""
+    with _cache_lock:
+        return _cache.get(host)
+
+
+def clear_cache(host: Optional[str] = None):
+    """Forget the tuning of `host`, or of every host if omitted."""
+    with _cache_lock:
+        if host is None:
+            _cache.clear()
+        else:
+            _cache.pop(host, None)
+
+
+class AutoTuner:
+    """
+    Choose frame and batch sizes from measured RTT and upload throughput.
+
+    Every batch costs one round trip plus its transfer time. Batches are
+    sized so the round trip is at most ``RTT_SHARE`` of a flush, which keeps
+    throughput near the link bandwidth, and bounded by ``MAX_BATCH_BYTES``.
+    With a latency target, a batch must also be acknowledged within the target,
+    which caps the batch and, on very slow links, the frame size. Frames never
+    exceed the protocol's 0xffff byte block limit, even when compression
+    makes a block larger than its input.
+
+    The RTT is probed with ``PING`` once per host. Results are cached per host
+    and used as the starting point of the next upload to the same server.
+    """
+
+    def __init__(self, host: str, latency_target: Optional[float] = None, alpha: float = DEFAULT_ALPHA):
+        """
+        Initialize a tuner for one upload.
+
+        Parameters
+        ----------
+        host : str
+            Cache key of the server, usually ``str(pool.transport)``.
+        latency_target : float, optional
+            Upper bound on the round trip of one batch in seconds.
+            Throughput is maximized if omitted.
+        alpha : float, optional
+            Smoothing factor of the throughput EWMA (defaults to 0.3).
+        """
+        self._alpha = alpha
+        self._frame_bytes = None
+        self.tuning = Tuning(host, latency_target)
+
+        previous = cached(host)
+        if previous is not None:
+            self.tuning.rtt = previous.rtt
+            self.tuning.bandwidth = previous.bandwidth
+            self.tuning.batch_size = previous.batch_size
+
+    def probe(self, command: Command):
+        """Measure the RTT with ``PING`` unless it is already known for this host."""
+        if self.tuning.rtt is not None:
+            return
+        rtts = []
+        for _ in range(PROBES):
+            start = time.monotonic()
+            command.execute_command("PING")
+            rtts.append(time.monotonic() - start)
+        self.tuning.rtt = min(rtts)
+
+    def chunk_size(self, block_align: int) -> int:
+        """
+        Return the frame payload size for samples of `block_align` bytes.
+
+        Larger frames cost fewer headers and compressor calls, so the largest
+        aligned size whose worst-case compressed form stays below 0xffff is
+        used unless a single frame would miss the latency target.
+        """
+        t = self.tuning
+        size = MAX_CHUNK_SIZE
+        budget = self._budget()
+        if budget is not None:
+            size = min(size, int(budget))
+        size = max(block_align, size - size % block_align)
+        t.chunk_size = size
+        return size
+
+    def batch_size(self) -> int:
+        """Return the number of frames to put in the next batch."""
+        return self.tuning.batch_size
+
+    def observe(self, wire_bytes: int, frames: int, elapsed: float) -> int:
+        """
+        Record one flush and return the batch size for the next.
+
+        Parameters
+        ----------
+        wire_bytes : int
+            Size of the batch request in bytes.
+        frames : int
+            Number of frames in the batch.
+        elapsed : float
+            Seconds from sending the batch to receiving its acknowledgement.
+
+        Returns
+        -------
+        int
+            Number of frames for the next batch.
+        """
+        t = self.tuning
+        t.flushes += 1
+
+        if frames:
+            per_frame = wire_bytes / frames
+            self._frame_bytes = per_frame if self._frame_bytes is None else \
+                self._alpha * per_frame + (1 - self._alpha) * self._frame_bytes
+
+        rtt = t.rtt or 0.0
+        if elapsed < rtt:
+            # Faster than the probe, so the link RTT was overestimated.
+            t.rtt = rtt = elapsed
+        transfer = elapsed - rtt
+        if transfer > 0:
+            bandwidth = wire_bytes / transfer
+            t.bandwidth = bandwidth if t.bandwidth is None else \
+                self._alpha * bandwidth + (1 - self._alpha) * t.bandwidth
+
+        if t.bandwidth is not None and self._frame_bytes:
+            # rtt <= RTT_SHARE * (rtt + bytes / bandwidth)
+            target = rtt * t.bandwidth * (1 - RTT_SHARE) / RTT_SHARE
+            budget = self._budget()
+            if budget is not None:
+                target = min(target, budget)
+            target = min(target, MAX_BATCH_BYTES)
+            t.batch_size = max(1, min(MAX_BATCH_SIZE, int(target / self._frame_bytes)))
+
+        return t.batch_size
+
+    def _budget(self) -> Optional[float]:
+        """Bytes that can be transferred within the latency target after one round trip."""
+        t = self.tuning
+        if t.latency_target is None or t.bandwidth is None:
+            return None
+        return max(0.0, t.latency_target - (t.rtt or 0.0)) * t.bandwidth
+
+    def save(self):
+        """Cache the tuning for the next upload to the same host."""
+        with _cache_lock:
+            _cache[self.tuning.host] = self.tuning
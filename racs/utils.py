@@ -1,5 +1,6 @@
 import struct
 import uuid
+import mmh3
 from datetime import datetime, timezone
 from typing import Optional
 
@@ -63,3 +64,23 @@ def session_id() -> bytes:
     """
     return uuid.uuid4().bytes_le
 
+
+
+def stream_hash(stream_id: str) -> int:
+    """
+    Compute the 64-bit Murmur3 hash of a stream ID.
+
+    This is the value carried in the ``hash`` field of the frame header and
+    the key used to place streams on a cluster hash ring.
+
+    Parameters
+    ----------
+    stream_id : str
+        The stream identifier.
+
+    Returns
+    -------
+    int
+        Unsigned 64-bit hash.
+    """
+    return mmh3.hash64(stream_id, signed=False)[0]
@@ -0,0 +1,100 @@
+import struct
+
+from .excpetion import RacsException
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xfffe
+
+
+class WavInfo:
+    """
+    Format and location of the PCM data in a WAV file.
+
+    Attributes
+    ----------
+    sample_rate : int
+        Sample rate in Hz.
+    channels : int
+        Number of interleaved channels.
+    bit_depth : int
+        Bits per sample.
+    offset : int
+        Byte offset of the first PCM sample.
+    size : int
+        Size of the PCM data in bytes.
+    """
+
+    def __init__(self, sample_rate: int, channels: int, bit_depth: int, offset: int, size: int):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bit_depth = bit_depth
+        self.offset = offset
+        self.size = size
+
+
+def is_wav(buf) -> bool:
+    """Return True if `buf` starts with a RIFF/WAVE header."""
+    return len(buf) >= 12 and buf[0:4] == b"RIFF" and buf[8:12] == b"WAVE"
+
+
+def parse_wav(buf) -> WavInfo:
+    """
+    Parse the header of a RIFF/WAVE file.
+
+    Only integer PCM is supported, either as ``WAVE_FORMAT_PCM`` or as
+    ``WAVE_FORMAT_EXTENSIBLE`` with a PCM sub-format. Chunks other than
+    ``fmt `` and ``data`` are skipped.
+
+    Parameters
+    ----------
+    buf : bytes-like
+        The file contents, typically a memory map.
+
+    Returns
+    -------
+    WavInfo
+        The audio format and the location of the PCM data in `buf`.
+
+    Raises
+    ------
+    RacsException
+        If the header is malformed or the encoding is not integer PCM.
+    """
+    if not is_wav(buf):
+        raise RacsException("not a RIFF/WAVE file")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = bytes(buf[pos:pos + 4])
+        size = struct.unpack_from("<I", buf, pos + 4)[0]
+        body = pos + 8
+
+        if chunk_id == b"fmt ":
+            if size < 16:
+                raise RacsException("malformed 'fmt ' chunk")
+            fmt = struct.unpack_from("<HHIIHH", buf, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE:
+                if size < 40:
+                    raise RacsException("malformed 'fmt ' chunk")
+                fmt = (struct.unpack_from("<H", buf, body + 24)[0],) + fmt[1:]
+
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise RacsException("'data' chunk found before 'fmt ' chunk")
+
+            audio_format, channels, sample_rate, _, block_align, bit_depth = fmt
+            if audio_format != WAVE_FORMAT_PCM:
+                raise RacsException(f"unsupported WAV encoding {audio_format:#06x}")
+            if block_align != channels * (bit_depth // 8):
+                raise RacsException("WAV block align does not match channels and bit depth")
+
+            # Streaming writers leave the size unset, so clip to the file.
+            size = min(size, len(buf) - body)
+            size -= size % block_align
+            return WavInfo(sample_rate, channels, bit_depth, body, size)
+
+        pos = body + size + (size & 1)
+
+    raise RacsException("WAV file has no 'data' chunk")
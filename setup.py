@@ -5,6 +5,8 @@ setup(
     version="0.1.2",
     packages=find_packages(),
     install_requires=["msgpack", "crc32c", "mmh3", "zstd"],
+    extras_require={"numpy": ["numpy"]},
+    entry_points={"console_scripts": ["racs-loadgen=racs.loadgen:main"]},
     description="Python client library for RACS",
     long_description=open("README.md").read(),
     long_description_content_type="text/markdown",